@@ -8,18 +8,58 @@ from .notion_agent import (
     NotionAgent,
     NotionClient,
     BlockBuilder,
+    CircuitBreaker,
+    CircuitOpenError,
+    ConnectionConfig,
+    ContentStore,
+    CreateJournal,
+    DeadlineExceeded,
+    Histogram,
+    Metrics,
+    Prefetcher,
     PropertyBuilder,
+    PropertyValidationError,
+    RateLimiter,
+    ResponseCache,
+    RetryPolicy,
+    SchemaValidator,
+    TOOLS,
     Tool,
+    ToolRegistry,
     ToolResult,
     ToolCategory,
+    block_text,
+    blocks_to_text,
+    deadline,
+    iter_block_text,
 )
 
 __all__ = [
     "NotionAgent",
     "NotionClient",
     "BlockBuilder",
+    "CircuitBreaker",
+    "CircuitOpenError",
+    "ConnectionConfig",
+    "ContentStore",
+    "CreateJournal",
+    "DeadlineExceeded",
+    "Histogram",
+    "Metrics",
+    "Prefetcher",
     "PropertyBuilder",
+    "PropertyValidationError",
+    "RateLimiter",
+    "ResponseCache",
+    "RetryPolicy",
+    "SchemaValidator",
+    "TOOLS",
     "Tool",
+    "ToolRegistry",
     "ToolResult",
     "ToolCategory",
+    "block_text",
+    "blocks_to_text",
+    "deadline",
+    "iter_block_text",
 ]
@@ -14,13 +14,37 @@ full read/write access to Notion workspaces.
 from __future__ import annotations
 
 import asyncio
+import difflib
+import hashlib
 import json
 import os
+import random
 import re
-from dataclasses import dataclass, field
-from datetime import datetime
+import sqlite3
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timezone
 from enum import Enum
-from typing import Any, Callable, Dict, List, Optional, Union
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    FrozenSet,
+    List,
+    Iterable,
+    Iterator,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+from weakref import WeakKeyDictionary
 
 import httpx
 
@@ -29,6 +53,11 @@ import httpx
 # -----------------------------------------------------------------------------
 NOTION_API_VERSION = "2022-06-28"
 NOTION_BASE_URL = "https://api.notion.com/v1"
+NOTION_REQUESTS_PER_SECOND = 3.0
+# Append-children request limits
+NOTION_MAX_CHILDREN = 100
+NOTION_MAX_NESTING = 2
+NOTION_MAX_BLOCKS_PER_REQUEST = 1000
 
 
 # -----------------------------------------------------------------------------
@@ -43,13 +72,21 @@ class ToolCategory(str, Enum):
 
 @dataclass
 class Tool:
-    """Definition of an agent tool."""
+    """Definition of an agent tool and the policy it runs under."""
     name: str
     description: str
     category: ToolCategory
     parameters: Dict[str, Any]
     required_params: List[str] = field(default_factory=list)
     examples: List[str] = field(default_factory=list)
+    # Called as handler(agent, **params).
+    handler: Optional[Callable[..., Awaitable[Any]]] = field(default=None, repr=False)
+    max_concurrency: Optional[int] = None  # calls at once across agents; None = no cap
+    timeout_s: Optional[float] = None  # default deadline, before the agent's
+    # >1 reruns the whole handler on transient failures; NotionClient already
+    # retries 429/5xx/transport errors per request, so reads leave this at 1.
+    max_attempts: int = 1
+    cacheable: bool = False  # a pure read: identical concurrent calls share one run
 
 
 @dataclass
@@ -60,6 +97,1509 @@ class ToolResult:
     error: Optional[str] = None
     tool_name: str = ""
     execution_time_ms: float = 0
+    index: Optional[int] = None  # position of the item in a bulk request
+
+
+class ToolRegistry:
+    """
+    Tools by name, plus the execution state their policies need.
+
+    The module-level ``TOOLS`` registry is shared by every NotionAgent, so a
+    tool's ``max_concurrency`` caps it across agents (per event loop), and
+    identical in-flight calls of ``cacheable`` tools are shared between them.
+    Use ``configure`` to change a tool's policy; ``ToolRegistry(TOOLS)``
+    makes an independent copy.
+    """
+
+    def __init__(self, tools: Iterable[Tool] = ()):
+        self._tools: Dict[str, Tool] = {}
+        # Semaphores belong to one event loop: loop -> {tool name: semaphore}.
+        self._semaphores: WeakKeyDictionary = WeakKeyDictionary()
+        self.inflight: Dict[Tuple, asyncio.Future] = {}
+        self.coalesced_count = 0
+        self._active: Dict[str, int] = {}
+        self._waiting: Dict[str, int] = {}
+        for tool in tools:
+            self.register(tool)
+
+    def register(self, tool: Tool) -> Tool:
+        self._tools[tool.name] = tool
+        for semaphores in self._semaphores.values():
+            semaphores.pop(tool.name, None)
+        return tool
+
+    def configure(self, name: str, **changes: Any) -> Tool:
+        """Change a tool's fields (e.g. ``max_concurrency``) in place of the old one."""
+        return self.register(replace(self._tools[name], **changes))
+
+    def __getitem__(self, name: str) -> Tool:
+        return self._tools[name]
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._tools
+
+    def __iter__(self) -> Iterator[Tool]:
+        return iter(list(self._tools.values()))
+
+    def __len__(self) -> int:
+        return len(self._tools)
+
+    def get(self, name: str) -> Optional[Tool]:
+        return self._tools.get(name)
+
+    def shared(self, key: Tuple, start: Callable[[], Awaitable[Any]]) -> asyncio.Future:
+        """The in-flight call for ``key``, starting one with ``start`` if there is none."""
+        task = self.inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(start())
+            self.inflight[key] = task
+            task.add_done_callback(lambda done: self._finish_shared(key, done))
+        else:
+            self.coalesced_count += 1
+        return task
+
+    def _finish_shared(self, key: Tuple, task: asyncio.Future) -> None:
+        if self.inflight.get(key) is task:
+            del self.inflight[key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved even if every waiter went away
+
+    @asynccontextmanager
+    async def slot(self, tool: Tool) -> AsyncIterator[None]:
+        """Hold one of the tool's concurrency slots for the duration of a call."""
+        semaphore = None
+        if tool.max_concurrency:
+            semaphores = self._semaphores.setdefault(asyncio.get_running_loop(), {})
+            semaphore = semaphores.get(tool.name)
+            if semaphore is None:
+                semaphore = semaphores[tool.name] = asyncio.Semaphore(tool.max_concurrency)
+        self._waiting[tool.name] = self._waiting.get(tool.name, 0) + 1
+        try:
+            if semaphore is not None:
+                await semaphore.acquire()
+        finally:
+            self._waiting[tool.name] -= 1
+        self._active[tool.name] = self._active.get(tool.name, 0) + 1
+        try:
+            yield
+        finally:
+            self._active[tool.name] -= 1
+            if semaphore is not None:
+                semaphore.release()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-tool limit, calls running and calls waiting for a slot."""
+        return {
+            name: {
+                "max_concurrency": tool.max_concurrency,
+                "active": self._active.get(name, 0),
+                "waiting": self._waiting.get(name, 0),
+            }
+            for name, tool in self._tools.items()
+        }
+
+
+def _is_ambiguous(error: Exception) -> bool:
+    """Whether a failed write may still have been applied (timeout or 5xx)."""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500
+    return isinstance(error, httpx.TransportError)
+
+
+def _is_transient(error: Exception) -> bool:
+    """Whether a failed tool call is worth retrying."""
+    if isinstance(error, (ValueError, LookupError, DeadlineExceeded, CircuitOpenError)):
+        return False  # bad input, unknown object, out of time, or breaker open
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code == 429 or error.response.status_code >= 500
+    return True
+
+
+# -----------------------------------------------------------------------------
+# Rate Limiting
+# -----------------------------------------------------------------------------
+class RateLimiter:
+    """
+    Token-bucket scheduler that paces every request a client sends.
+
+    Waiters are served in FIFO order. A 429 response pauses the whole bucket
+    for the server-provided ``Retry-After`` so queued calls back off together.
+    """
+
+    def __init__(self, rate: float = NOTION_REQUESTS_PER_SECOND, burst: int = 3):
+        if rate <= 0 or burst < 1:
+            raise ValueError("rate must be positive and burst at least 1")
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+        self._waiting = 0
+        self.total_wait_s = 0.0
+        self.acquired = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of requests currently waiting for a token."""
+        return self._waiting
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> float:
+        """Wait for a token. Returns the seconds spent throttled."""
+        self._waiting += 1
+        waited = 0.0
+        try:
+            async with self._lock:
+                while True:
+                    now = time.monotonic()
+                    if now < self._paused_until:
+                        delay = self._paused_until - now
+                    else:
+                        self._refill(now)
+                        if self._tokens >= 1:
+                            self._tokens -= 1
+                            break
+                        delay = (1 - self._tokens) / self.rate
+                    await asyncio.sleep(delay)
+                    waited += delay
+        finally:
+            self._waiting -= 1
+        self.acquired += 1
+        self.total_wait_s += waited
+        return waited
+
+    def pause(self, seconds: float) -> None:
+        """Stop handing out tokens for ``seconds`` (used for Retry-After)."""
+        now = time.monotonic()
+        self._paused_until = max(self._paused_until, now + seconds)
+        self._tokens = 0.0
+        self._updated = now
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of limiter state."""
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "queue_depth": self.queue_depth,
+            "acquired": self.acquired,
+            "total_wait_s": round(self.total_wait_s, 3),
+        }
+
+
+@dataclass
+class RetryPolicy:
+    """Retry settings for transient Notion API failures."""
+    max_retries: int = 5
+    backoff_base_s: float = 0.5
+    backoff_max_s: float = 30.0
+    retry_statuses: FrozenSet[int] = frozenset({429, 500, 502, 503, 504})
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff for the given attempt (0-based)."""
+        ceiling = min(self.backoff_max_s, self.backoff_base_s * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+
+def _retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    """Parse a numeric Retry-After header, if present."""
+    value = response.headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+# -----------------------------------------------------------------------------
+# Deadlines and Circuit Breaking
+# -----------------------------------------------------------------------------
+class DeadlineExceeded(TimeoutError):
+    """The caller's deadline passed before the operation could finish."""
+
+
+class CircuitOpenError(RuntimeError):
+    """Requests are being rejected locally while the API looks unhealthy."""
+
+
+# Absolute time.monotonic() deadline of the current call chain. Context
+# variables are copied into tasks, so nested fetches inherit it.
+_deadline: ContextVar[Optional[float]] = ContextVar("notion_deadline", default=None)
+
+
+@contextmanager
+def deadline(seconds: Optional[float]) -> Iterator[None]:
+    """
+    Bound every Notion request made inside the block to ``seconds`` from now.
+
+    Nested scopes can only shorten an outer deadline. ``None`` is a no-op.
+    """
+    if seconds is None:
+        yield
+        return
+    at = time.monotonic() + seconds
+    outer = _deadline.get()
+    token = _deadline.set(at if outer is None else min(at, outer))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_time() -> Optional[float]:
+    """Seconds left before the current deadline, or None if there is none."""
+    at = _deadline.get()
+    return None if at is None else at - time.monotonic()
+
+
+async def _bounded(awaitable: Awaitable[Any]) -> Any:
+    """Await ``awaitable`` within the current deadline."""
+    remaining = remaining_time()
+    if remaining is None:
+        return await awaitable
+    if remaining <= 0:
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        raise DeadlineExceeded("Deadline exceeded")
+    try:
+        return await asyncio.wait_for(awaitable, remaining)
+    except TimeoutError:
+        raise DeadlineExceeded("Deadline exceeded") from None
+
+
+class CircuitBreaker:
+    """
+    Fails requests fast once the API returns a burst of errors.
+
+    ``failure_threshold`` failures (transport errors, including httpx
+    timeouts, and 5xx responses) within ``window_s`` open the circuit; a
+    caller's own deadline running out is not counted. While open, requests
+    raise CircuitOpenError immediately and a background probe checks the API
+    every ``reset_timeout_s`` (doubling up to ``max_reset_timeout_s``); the
+    first successful probe closes the circuit again.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        window_s: float = 10.0,
+        reset_timeout_s: float = 5.0,
+        max_reset_timeout_s: float = 60.0,
+    ):
+        self.failure_threshold = failure_threshold
+        self.window_s = window_s
+        self.reset_timeout_s = reset_timeout_s
+        self.max_reset_timeout_s = max_reset_timeout_s
+        self._failures: List[float] = []
+        self._opened_at: Optional[float] = None
+        self._probe_task: Optional[asyncio.Future] = None
+        self.times_opened = 0
+        self.rejected = 0
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def check(self) -> None:
+        """Raise CircuitOpenError if requests should not be sent."""
+        if self._opened_at is not None:
+            self.rejected += 1
+            raise CircuitOpenError(
+                f"Notion API circuit open for {time.monotonic() - self._opened_at:.1f}s"
+            )
+
+    def record_success(self) -> None:
+        self._failures.clear()
+
+    def record_failure(self, probe: Callable[[], Awaitable[Any]]) -> None:
+        """Count a failure; ``probe`` is called in the background once open."""
+        now = time.monotonic()
+        self._failures = [t for t in self._failures if now - t < self.window_s]
+        self._failures.append(now)
+        if self._opened_at is None and len(self._failures) >= self.failure_threshold:
+            self._opened_at = now
+            self.times_opened += 1
+            self._probe_task = asyncio.ensure_future(self._probe_until_closed(probe))
+
+    async def _probe_until_closed(self, probe: Callable[[], Awaitable[Any]]) -> None:
+        delay = self.reset_timeout_s
+        while self._opened_at is not None:
+            await asyncio.sleep(delay)
+            try:
+                await probe()
+            except Exception:
+                delay = min(self.max_reset_timeout_s, delay * 2)
+            else:
+                self.close()
+
+    def close(self) -> None:
+        """Close the circuit (also stops any background probe)."""
+        self._opened_at = None
+        self._failures.clear()
+        if self._probe_task is not None and self._probe_task is not asyncio.current_task():
+            self._probe_task.cancel()
+        self._probe_task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "open": self.is_open,
+            "recent_failures": len(self._failures),
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+        }
+
+
+# -----------------------------------------------------------------------------
+# Metrics
+# -----------------------------------------------------------------------------
+# Latency bucket upper bounds in seconds (Prometheus-style, +Inf implied).
+DEFAULT_LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+_ID_SEGMENT = re.compile(
+    r"/[0-9a-fA-F]{8}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{12}"
+)
+
+
+def _endpoint_name(method: str, path: str) -> str:
+    """Collapse object IDs so ``GET /pages/<id>`` is one series."""
+    return f"{method} {_ID_SEGMENT.sub('/{id}', path)}"
+
+
+class Histogram:
+    """Fixed-bucket latency histogram with estimated quantiles."""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        index = 0
+        while index < len(self.buckets) and value > self.buckets[index]:
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """Estimate the ``q`` quantile by interpolating within its bucket."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for index, count in enumerate(self.counts):
+            upper = self.buckets[index] if index < len(self.buckets) else self.max
+            if count and seen + count >= rank:
+                return min(self.max, lower + (upper - lower) * (rank - seen) / count)
+            seen += count
+            lower = upper
+        return self.max
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """(le, cumulative count) pairs, ending with +Inf."""
+        pairs = []
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            pairs.append((f"{bound:g}", total))
+        pairs.append(("+Inf", self.count))
+        return pairs
+
+
+@dataclass
+class _Series:
+    latency: Histogram
+    calls: int = 0
+    errors: int = 0
+    retries: int = 0
+    bytes_in: int = 0
+    bytes_out: int = 0
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Metrics:
+    """
+    Per-endpoint and per-tool counters and latency histograms.
+
+    Series are keyed by ``(kind, name)``: NotionClient records ``request``
+    (one per HTTP attempt) and ``throttle`` (rate-limiter wait) series per
+    endpoint, NotionAgent records ``tool`` series per tool, and local
+    conversion work is recorded as ``convert``. All timings use the
+    monotonic ``time.perf_counter`` clock.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._series: Dict[Tuple[str, str], _Series] = {}
+
+    def _get(self, kind: str, name: str) -> _Series:
+        series = self._series.get((kind, name))
+        if series is None:
+            series = self._series[(kind, name)] = _Series(Histogram(self.buckets))
+        return series
+
+    def observe(
+        self,
+        kind: str,
+        name: str,
+        seconds: float,
+        *,
+        error: bool = False,
+        bytes_in: int = 0,
+        bytes_out: int = 0,
+    ) -> None:
+        series = self._get(kind, name)
+        series.calls += 1
+        series.errors += int(error)
+        series.bytes_in += bytes_in
+        series.bytes_out += bytes_out
+        series.latency.observe(seconds)
+
+    def record_retry(self, kind: str, name: str) -> None:
+        self._get(kind, name).retries += 1
+
+    @contextmanager
+    def timer(self, kind: str, name: str) -> Iterator[None]:
+        """Time a block of code; exceptions are counted as errors."""
+        start = time.perf_counter()
+        error = False
+        try:
+            yield
+        except BaseException:
+            error = True
+            raise
+        finally:
+            self.observe(kind, name, time.perf_counter() - start, error=error)
+
+    def reset(self) -> None:
+        self._series.clear()
+
+    def snapshot(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """``{kind: {name: stats}}`` with counts and latency percentiles in ms."""
+        result: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for (kind, name), series in sorted(self._series.items()):
+            latency = series.latency
+            result.setdefault(kind, {})[name] = {
+                "calls": series.calls,
+                "errors": series.errors,
+                "retries": series.retries,
+                "bytes_in": series.bytes_in,
+                "bytes_out": series.bytes_out,
+                "total_ms": round(latency.sum * 1000, 3),
+                "mean_ms": round(latency.sum / latency.count * 1000, 3)
+                if latency.count
+                else 0.0,
+                "p50_ms": round(latency.quantile(0.50) * 1000, 3),
+                "p95_ms": round(latency.quantile(0.95) * 1000, 3),
+                "p99_ms": round(latency.quantile(0.99) * 1000, 3),
+                "max_ms": round(latency.max * 1000, 3),
+            }
+        return result
+
+    def to_prometheus(self, prefix: str = "notion") -> str:
+        """Render every series in the Prometheus text exposition format."""
+        counters = (
+            ("calls_total", "Calls observed", "calls"),
+            ("errors_total", "Calls that failed", "errors"),
+            ("retries_total", "Retried attempts", "retries"),
+            ("received_bytes_total", "Response bytes received", "bytes_in"),
+            ("sent_bytes_total", "Request bytes sent", "bytes_out"),
+        )
+        items = sorted(self._series.items())
+        lines: List[str] = []
+        for suffix, help_text, attr in counters:
+            metric = f"{prefix}_{suffix}"
+            lines.append(f"# HELP {metric} {help_text}.")
+            lines.append(f"# TYPE {metric} counter")
+            for (kind, name), series in items:
+                labels = f'kind="{_label(kind)}",name="{_label(name)}"'
+                lines.append(f"{metric}{{{labels}}} {getattr(series, attr)}")
+
+        metric = f"{prefix}_duration_seconds"
+        lines.append(f"# HELP {metric} Latency of calls.")
+        lines.append(f"# TYPE {metric} histogram")
+        for (kind, name), series in items:
+            labels = f'kind="{_label(kind)}",name="{_label(name)}"'
+            for le, count in series.latency.cumulative():
+                lines.append(f'{metric}_bucket{{{labels},le="{le}"}} {count}')
+            lines.append(f"{metric}_sum{{{labels}}} {series.latency.sum:.6f}")
+            lines.append(f"{metric}_count{{{labels}}} {series.latency.count}")
+        return "\n".join(lines) + "\n"
+
+
+# -----------------------------------------------------------------------------
+# Bulk Execution
+# -----------------------------------------------------------------------------
+async def _run_bulk(
+    items: Iterable[Any],
+    operation: Callable[[Any], Awaitable[Any]],
+    tool_name: str,
+    concurrency: int,
+    max_attempts: int,
+    retry_policy: RetryPolicy,
+    retry_if: Optional[Callable[[Exception], bool]] = None,
+) -> AsyncIterator[ToolResult]:
+    """
+    Run ``operation`` over ``items`` with at most ``concurrency`` in flight.
+
+    Items are pulled lazily, results are yielded as they complete (tagged
+    with the item's index), and only failed items are retried, with backoff,
+    up to ``max_attempts`` times. ValueErrors (bad input, including
+    PropertyValidationError) and errors ``retry_if`` rejects fail the item
+    immediately.
+    """
+    if concurrency < 1 or max_attempts < 1:
+        raise ValueError("concurrency and max_attempts must be at least 1")
+    results: asyncio.Queue = asyncio.Queue()
+    finished = object()
+    pending = enumerate(items)
+
+    async def worker() -> None:
+        try:
+            for index, item in pending:
+                start = time.perf_counter()
+                for attempt in range(max_attempts):
+                    try:
+                        data = await operation(item)
+                    except Exception as e:
+                        if (
+                            attempt + 1 == max_attempts
+                            or isinstance(e, ValueError)
+                            or (retry_if is not None and not retry_if(e))
+                        ):
+                            result = ToolResult(success=False, error=str(e))
+                            break
+                        await asyncio.sleep(retry_policy.backoff(attempt))
+                    else:
+                        result = ToolResult(success=True, data=data)
+                        break
+                result.tool_name = tool_name
+                result.index = index
+                result.execution_time_ms = (time.perf_counter() - start) * 1000
+                results.put_nowait(result)
+        finally:
+            results.put_nowait(finished)
+
+    workers = [asyncio.ensure_future(worker()) for _ in range(concurrency)]
+    try:
+        remaining = len(workers)
+        while remaining:
+            result = await results.get()
+            if result is finished:
+                remaining -= 1
+            else:
+                yield result
+        for task in workers:
+            task.result()  # surface errors raised by the items iterable
+    finally:
+        for task in workers:
+            task.cancel()
+
+
+# -----------------------------------------------------------------------------
+# Connection Settings
+# -----------------------------------------------------------------------------
+@dataclass
+class ConnectionConfig:
+    """HTTP pool, protocol and timeout settings for NotionClient."""
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry_s: float = 30.0
+    http2: bool = False  # requires the h2 package (pip install httpx[http2])
+    connect_timeout_s: float = 5.0
+    read_timeout_s: float = 30.0
+    write_timeout_s: float = 30.0
+    pool_timeout_s: float = 10.0
+
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry_s,
+        )
+
+    def timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(
+            connect=self.connect_timeout_s,
+            read=self.read_timeout_s,
+            write=self.write_timeout_s,
+            pool=self.pool_timeout_s,
+        )
+
+
+# -----------------------------------------------------------------------------
+# Response Caching
+# -----------------------------------------------------------------------------
+def _normalize_id(object_id: str) -> str:
+    """Notion accepts IDs with or without dashes; key caches on one form."""
+    return object_id.replace("-", "").lower()
+
+
+@dataclass
+class _CacheEntry:
+    value: Any
+    expires_at: float
+    object_ids: Tuple[str, ...]
+    last_edited_time: Optional[str] = None
+
+
+class ResponseCache:
+    """
+    Size-bounded LRU cache with per-entry TTLs for Notion read responses.
+
+    Entries are keyed by request kind, object ID and params, and indexed by
+    every object they contain so a write to any of them evicts the entry.
+    Cached values are shared; treat them as read-only.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_s: float = 300.0,
+        revalidate: bool = True,
+    ):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.revalidate = revalidate
+        self._entries: "OrderedDict[Tuple, _CacheEntry]" = OrderedDict()
+        self._by_object: Dict[str, Set[Tuple]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.revalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Tuple) -> Optional[Any]:
+        """Return a fresh cached value, or None (counted as a miss)."""
+        entry = self._entries.get(key)
+        if entry is None or entry.expires_at <= time.monotonic():
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.value
+
+    def peek_stale(self, key: Tuple) -> Optional[_CacheEntry]:
+        """Return an expired entry that may still be revalidated."""
+        entry = self._entries.get(key)
+        if entry is None or entry.expires_at > time.monotonic():
+            return None
+        return entry
+
+    def refresh(self, key: Tuple, ttl_s: Optional[float] = None) -> None:
+        """Extend an entry's lifetime after a successful revalidation."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry.expires_at = time.monotonic() + (ttl_s or self.ttl_s)
+            self._entries.move_to_end(key)
+            self.revalidations += 1
+
+    def set(
+        self,
+        key: Tuple,
+        value: Any,
+        object_ids: Iterable[str],
+        last_edited_time: Optional[str] = None,
+        ttl_s: Optional[float] = None,
+    ) -> None:
+        """Store a value under ``key``, indexed by the objects it contains."""
+        if key in self._entries:
+            self._remove(key)
+        ids = tuple({_normalize_id(oid) for oid in object_ids if oid})
+        self._entries[key] = _CacheEntry(
+            value=value,
+            expires_at=time.monotonic() + (ttl_s or self.ttl_s),
+            object_ids=ids,
+            last_edited_time=last_edited_time,
+        )
+        for oid in ids:
+            self._by_object.setdefault(oid, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def invalidate(self, object_id: str) -> int:
+        """Drop every entry that contains ``object_id``. Returns entries dropped."""
+        keys = self._by_object.pop(_normalize_id(object_id), set())
+        for key in keys:
+            self._remove(key)
+        self.invalidations += len(keys)
+        return len(keys)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._by_object.clear()
+
+    def _remove(self, key: Tuple) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for oid in entry.object_ids:
+            keys = self._by_object.get(oid)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_object[oid]
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "revalidations": self.revalidations,
+        }
+
+
+@dataclass
+class StoredObject:
+    """A row read back from a ContentStore."""
+    data: Any
+    last_edited_time: Optional[str]
+    fetched_at: float
+
+    def is_fresh(self, fresh_s: float) -> bool:
+        return time.time() - self.fetched_at < fresh_s
+
+
+class ContentStore:
+    """
+    On-disk cache of pages, databases and block trees (SQLite, WAL mode).
+
+    Survives process restarts so a cold client can serve recently fetched
+    content locally and only ask Notion whether it changed. Rows younger
+    than ``fresh_s`` are served without any request; older block trees are
+    revalidated against their root's ``last_edited_time``.
+    """
+
+    _SCHEMA = (
+        """CREATE TABLE IF NOT EXISTS objects (
+            kind TEXT NOT NULL,
+            id TEXT NOT NULL,
+            last_edited_time TEXT,
+            fetched_at REAL NOT NULL,
+            data TEXT NOT NULL,
+            PRIMARY KEY (kind, id)
+        )""",
+        """CREATE TABLE IF NOT EXISTS members (
+            member_id TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            id TEXT NOT NULL,
+            PRIMARY KEY (member_id, kind, id)
+        )""",
+        "CREATE INDEX IF NOT EXISTS members_owner ON members (kind, id)",
+    )
+
+    def __init__(self, path: str, fresh_s: float = 60.0):
+        self.path = os.path.expanduser(path)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.fresh_s = fresh_s
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            for statement in self._SCHEMA:
+                self._conn.execute(statement)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, kind: str, object_id: str) -> Optional[StoredObject]:
+        row = self._conn.execute(
+            "SELECT data, last_edited_time, fetched_at FROM objects"
+            " WHERE kind = ? AND id = ?",
+            (kind, _normalize_id(object_id)),
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return StoredObject(json.loads(row[0]), row[1], row[2])
+
+    def put(
+        self,
+        kind: str,
+        object_id: str,
+        data: Any,
+        last_edited_time: Optional[str] = None,
+        member_ids: Iterable[str] = (),
+    ) -> None:
+        """Store an object, indexed by itself and every ID in ``member_ids``."""
+        oid = _normalize_id(object_id)
+        members = {oid, *(_normalize_id(m) for m in member_ids if m)}
+        with self._conn:
+            self._conn.execute(
+                "DELETE FROM members WHERE kind = ? AND id = ?", (kind, oid)
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO objects VALUES (?, ?, ?, ?, ?)",
+                (kind, oid, last_edited_time, time.time(), json.dumps(data)),
+            )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO members VALUES (?, ?, ?)",
+                [(member, kind, oid) for member in members],
+            )
+
+    def touch(self, kind: str, object_id: str) -> None:
+        """Mark an object as just validated."""
+        with self._conn:
+            self._conn.execute(
+                "UPDATE objects SET fetched_at = ? WHERE kind = ? AND id = ?",
+                (time.time(), kind, _normalize_id(object_id)),
+            )
+
+    def invalidate(self, object_id: str) -> int:
+        """Delete every stored object containing ``object_id``."""
+        owners = self._conn.execute(
+            "SELECT kind, id FROM members WHERE member_id = ?",
+            (_normalize_id(object_id),),
+        ).fetchall()
+        with self._conn:
+            for kind, oid in owners:
+                for table in ("objects", "members"):
+                    self._conn.execute(
+                        f"DELETE FROM {table} WHERE kind = ? AND id = ?", (kind, oid)
+                    )
+        return len(owners)
+
+    def stats(self) -> Dict[str, Any]:
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM objects").fetchone()
+        return {"objects": count, "hits": self.hits, "misses": self.misses}
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def _tree_ids(blocks: List[Dict[str, Any]]) -> List[str]:
+    """IDs of every block in a fetched tree."""
+    ids = []
+    stack = list(blocks)
+    while stack:
+        block = stack.pop()
+        if block.get("id"):
+            ids.append(block["id"])
+        stack.extend(block.get("children") or [])
+    return ids
+
+
+def _plain(rich_text: Optional[List[Dict[str, Any]]]) -> str:
+    return "".join(item.get("plain_text", "") for item in rich_text or [])
+
+
+# Blocks whose payload points at a file or URL, optionally with a caption.
+_MEDIA_TYPES = frozenset(
+    {"image", "video", "audio", "file", "pdf", "embed", "bookmark", "link_preview"}
+)
+
+
+def block_text(block: Dict[str, Any]) -> str:
+    """Plain text of a single block (without its children)."""
+    block_type = block.get("type", "")
+    data = block.get(block_type) or {}
+    if "rich_text" in data:
+        text = _plain(data["rich_text"])
+        caption = _plain(data.get("caption"))
+        return f"{text}\n{caption}" if text and caption else text or caption
+    if block_type == "equation":
+        return data.get("expression", "")
+    if block_type == "table_row":
+        return " | ".join(_plain(cell) for cell in data.get("cells", []))
+    if block_type in ("child_page", "child_database"):
+        return data.get("title", "")
+    if block_type in _MEDIA_TYPES:
+        caption = _plain(data.get("caption"))
+        url = data.get("url") or (data.get(data.get("type", "")) or {}).get("url", "")
+        return caption or url
+    if block_type == "link_to_page":
+        return data.get(data.get("type", ""), "")
+    if block_type == "divider":
+        return "---"
+    return ""
+
+
+def iter_text_lines(blocks: Iterable[Dict[str, Any]], depth: int = 0) -> Iterable[str]:
+    """Yield indented text lines for blocks and any nested ``children``."""
+    indent = "  " * depth
+    for block in blocks:
+        text = block_text(block)
+        if text:
+            for line in text.split("\n"):
+                yield indent + line
+        if block.get("children"):
+            yield from iter_text_lines(block["children"], depth + 1)
+
+
+def blocks_to_text(blocks: List[Dict], depth: int = 0) -> str:
+    """Convert blocks (and any nested ``children``) to indented plain text."""
+    return "\n".join(iter_text_lines(blocks, depth))
+
+
+async def iter_block_text(blocks: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[str]:
+    """Yield text lines as blocks arrive from an async iterator."""
+    async for block in blocks:
+        for line in iter_text_lines([block]):
+            yield line
+
+
+# Child pages/databases are separate documents; don't inline them.
+_OPAQUE_CHILD_TYPES = frozenset({"child_page", "child_database"})
+
+
+def _has_fetchable_children(block: Dict[str, Any]) -> bool:
+    return bool(block.get("has_children")) and block.get("type") not in _OPAQUE_CHILD_TYPES
+
+
+def _children_source_id(block: Dict[str, Any]) -> str:
+    """Block whose children hold the content (synced copies point at the original)."""
+    if block.get("type") == "synced_block":
+        synced_from = (block.get("synced_block") or {}).get("synced_from")
+        if synced_from and synced_from.get("block_id"):
+            return synced_from["block_id"]
+    return block["id"]
+
+
+def _inline_children(block: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Children nested in a block payload being written (``block[type].children``)."""
+    return (block.get(block.get("type", "")) or {}).get("children") or []
+
+
+def _inline_size(block: Dict[str, Any], depth: int = 0) -> Optional[int]:
+    """
+    Blocks in ``block``'s subtree if it can be sent in one append request,
+    or None when it nests too deep or has an oversized children array.
+    """
+    children = _inline_children(block)
+    if not children:
+        return 1
+    if depth >= NOTION_MAX_NESTING or len(children) > NOTION_MAX_CHILDREN:
+        return None
+    total = 1
+    for child in children:
+        size = _inline_size(child, depth + 1)
+        if size is None:
+            return None
+        total += size
+    return total
+
+
+def _without_children(block: Dict[str, Any]) -> Dict[str, Any]:
+    block_type = block.get("type", "")
+    data = {k: v for k, v in block[block_type].items() if k != "children"}
+    return {**block, block_type: data}
+
+
+def _plan_append_chunks(
+    children: List[Dict[str, Any]],
+) -> List[List[Tuple[Dict[str, Any], List[Dict[str, Any]]]]]:
+    """
+    Split blocks into request-sized chunks.
+
+    Each entry is ``(block_to_send, deferred_children)``: blocks whose subtree
+    exceeds Notion's limits are sent bare and their children appended to the
+    created block afterwards.
+    """
+    chunks: List[List[Tuple[Dict[str, Any], List[Dict[str, Any]]]]] = []
+    current: List[Tuple[Dict[str, Any], List[Dict[str, Any]]]] = []
+    current_size = 0
+    for block in children:
+        size = _inline_size(block, 1)
+        if size is None:
+            entry = (_without_children(block), _inline_children(block))
+            size = 1
+        else:
+            entry = (block, [])
+        if current and (
+            len(current) >= NOTION_MAX_CHILDREN
+            or current_size + size > NOTION_MAX_BLOCKS_PER_REQUEST
+        ):
+            chunks.append(current)
+            current, current_size = [], 0
+        current.append(entry)
+        current_size += size
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+# -----------------------------------------------------------------------------
+# Block Diffing
+# -----------------------------------------------------------------------------
+# Blocks that can't be edited in place with update_block.
+_NON_UPDATABLE_TYPES = frozenset(
+    {
+        "table",
+        "column_list",
+        "column",
+        "synced_block",
+        "template",
+        "unsupported",
+        "link_preview",
+        "child_page",
+        "child_database",
+    }
+)
+
+
+def _rich_text_signature(items: Optional[List[Dict[str, Any]]]) -> List[List[Any]]:
+    """Rich text as (text, link, annotations) runs, merged like Notion stores them."""
+    runs: List[List[Any]] = []
+    for item in items or []:
+        text = item.get("plain_text")
+        if text is None:
+            value = item.get(item.get("type", "text")) or {}
+            text = value.get("content", value.get("expression", ""))
+        link = ((item.get("text") or {}).get("link") or {}).get("url")
+        annotations = {
+            k: v for k, v in (item.get("annotations") or {}).items() if v and v != "default"
+        }
+        if runs and runs[-1][1:] == [link, annotations]:
+            runs[-1][0] += text
+        else:
+            runs.append([text, link, annotations])
+    return runs
+
+
+def _block_signature(block: Dict[str, Any]) -> str:
+    """
+    Hash of what a block shows, comparable between fetched blocks and payloads.
+
+    Response-only fields and defaults (empty values, ``"default"`` colors)
+    are ignored; children (fetched or inline) are part of the signature.
+    """
+    kind = block.get("type", "")
+    content = {}
+    for key, value in (block.get(kind) or {}).items():
+        if key == "children":
+            continue
+        if key in ("rich_text", "caption"):
+            value = _rich_text_signature(value)
+        elif key == "cells":
+            value = [_rich_text_signature(cell) for cell in value]
+        if value and value != "default":
+            content[key] = value
+    children = block.get("children") or _inline_children(block)
+    signature = [kind, content, [_block_signature(child) for child in children]]
+    return hashlib.sha1(json.dumps(signature, sort_keys=True).encode()).hexdigest()
+
+
+def _update_key(block: Dict[str, Any]) -> Any:
+    """Blocks with equal keys can be turned into one another by update_block."""
+    kind = block.get("type")
+    if (
+        kind in _NON_UPDATABLE_TYPES
+        or block.get("has_children")
+        or block.get("children")
+        or _inline_children(block)
+    ):
+        return object()  # never equal: replace instead
+    return kind
+
+
+def _update_payload(block: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, Any]:
+    kind = block["type"]
+    data = {k: v for k, v in block[kind].items() if k != "children"}
+    if "color" in (current.get(kind) or {}):
+        data.setdefault("color", "default")  # clear a color the new block lacks
+    return {kind: data}
+
+
+@dataclass
+class _BlockSyncPlan:
+    kept: int = 0
+    updates: List[Tuple[str, Dict[str, Any]]] = field(default_factory=list)
+    deletes: List[str] = field(default_factory=list)
+    # (block to insert after, or None to append at the end; blocks to insert)
+    inserts: List[Tuple[Optional[str], List[Dict[str, Any]]]] = field(default_factory=list)
+
+
+def _plan_block_sync(
+    children: List[Dict[str, Any]], desired: List[Dict[str, Any]]
+) -> _BlockSyncPlan:
+    """
+    Edit script turning a parent's ``children`` into ``desired``.
+
+    Child pages and databases stay where they are. Identical blocks are
+    matched first (a longest-common-subsequence diff of block signatures).
+    In each changed region, blocks of the same type are then paired in order
+    and updated in place; the rest are deleted or inserted after the nearest
+    surviving block.
+
+    Notion can only insert *after* a block, so new content that must precede
+    every survivor goes after the child page/database just before the first
+    survivor; failing that, the first survivor is updated into the first new
+    block, or else moved below the new run (re-created, then deleted). With
+    no survivors, new content goes after the first old block. Deletes must
+    therefore run after the inserts.
+    """
+    current = [b for b in children if b.get("type") not in _OPAQUE_CHILD_TYPES]
+    old = [_block_signature(b) for b in current]
+    new = [_block_signature(b) for b in desired]
+    # Index into ``current`` of the block that will hold desired[j].
+    source: List[Optional[int]] = [None] * len(desired)
+    updated: Set[int] = set()
+
+    matcher = difflib.SequenceMatcher(None, old, new, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            source[j1:j2] = range(i1, i2)
+        elif tag == "replace":
+            old_keys = [_update_key(b) for b in current[i1:i2]]
+            new_keys = [_update_key(b) for b in desired[j1:j2]]
+            inner = difflib.SequenceMatcher(None, old_keys, new_keys, autojunk=False)
+            for a, b, size in inner.get_matching_blocks():
+                for k in range(size):
+                    source[j1 + b + k] = i1 + a + k
+                    updated.add(j1 + b + k)
+
+    # Where the new blocks before the first survivor go (None: the end).
+    lead_after: Optional[str] = None
+    first = next((j for j, i in enumerate(source) if i is not None), None)
+    if first is None:
+        lead_after = current[0]["id"] if current else None
+    elif first > 0:
+        survivor = current[source[first]]
+        position = next(k for k, b in enumerate(children) if b is survivor)
+        opaque = [
+            b for b in children[:position] if b.get("type") in _OPAQUE_CHILD_TYPES
+        ]
+        if opaque:
+            lead_after = opaque[-1]["id"]
+        elif _update_key(survivor) == _update_key(desired[0]):
+            source[0], source[first] = source[first], None
+            updated.discard(first)
+            updated.add(0)
+        else:
+            source[first] = None
+            updated.discard(first)
+            lead_after = survivor["id"]
+
+    plan = _BlockSyncPlan()
+    used = {i for i in source if i is not None}
+    plan.deletes = [b["id"] for i, b in enumerate(current) if i not in used]
+    previous = lead_after
+    run: List[Dict[str, Any]] = []
+    for j, i in enumerate(source):
+        if i is None:
+            run.append(desired[j])
+            continue
+        if run:
+            plan.inserts.append((previous, run))
+            run = []
+        previous = current[i]["id"]
+        if j in updated:
+            plan.updates.append((previous, _update_payload(desired[j], current[i])))
+        else:
+            plan.kept += 1
+    if run:
+        plan.inserts.append((previous, run))
+    return plan
+
+
+# -----------------------------------------------------------------------------
+# Schema Validation
+# -----------------------------------------------------------------------------
+# Property types the API computes itself and rejects on write.
+_READ_ONLY_PROPERTY_TYPES = frozenset(
+    {
+        "formula",
+        "rollup",
+        "created_time",
+        "created_by",
+        "last_edited_time",
+        "last_edited_by",
+        "unique_id",
+        "verification",
+        "button",
+    }
+)
+
+
+def _is_option(value: Any) -> bool:
+    return isinstance(value, dict) and ("name" in value or "id" in value)
+
+
+def _is_reference(value: Any) -> bool:
+    return isinstance(value, dict) and "id" in value
+
+
+def _is_optional_str(value: Any) -> bool:
+    return value is None or isinstance(value, str)
+
+
+# Shape checks for the value under a property's type key.
+_PROPERTY_VALUE_CHECKS: Dict[str, Callable[[Any], bool]] = {
+    "title": lambda v: isinstance(v, list),
+    "rich_text": lambda v: isinstance(v, list),
+    "number": lambda v: v is None
+    or (isinstance(v, (int, float)) and not isinstance(v, bool)),
+    "checkbox": lambda v: isinstance(v, bool),
+    "url": _is_optional_str,
+    "email": _is_optional_str,
+    "phone_number": _is_optional_str,
+    "date": lambda v: v is None
+    or (isinstance(v, dict) and isinstance(v.get("start"), str)),
+    "select": lambda v: v is None or _is_option(v),
+    "status": lambda v: v is None or _is_option(v),
+    "multi_select": lambda v: isinstance(v, list) and all(map(_is_option, v)),
+    "relation": lambda v: isinstance(v, list) and all(map(_is_reference, v)),
+    "people": lambda v: isinstance(v, list) and all(map(_is_reference, v)),
+    "files": lambda v: isinstance(v, list),
+}
+
+
+class PropertyValidationError(ValueError):
+    """Page properties rejected locally against a database schema."""
+
+    def __init__(self, database_id: str, errors: List[str]):
+        self.database_id = database_id
+        self.errors = errors
+        super().__init__(
+            f"Invalid properties for database {database_id}: " + "; ".join(errors)
+        )
+
+
+class SchemaValidator:
+    """
+    Property checks compiled once from a database schema.
+
+    Payloads may key properties by name or by property ID. Unknown names,
+    read-only properties, type mismatches and malformed values are errors.
+    Status options must exist; select and multi-select options are only
+    checked with ``strict_options`` since Notion creates new ones on write.
+    """
+
+    def __init__(self, database: Dict[str, Any], strict_options: bool = False):
+        self.database_id = database.get("id", "")
+        self.last_edited_time = database.get("last_edited_time")
+        self.title_property: Optional[str] = None
+        self._checks: Dict[str, Callable[[Any], Optional[str]]] = {}
+        for name, schema in database.get("properties", {}).items():
+            check = self._compile(name, schema, strict_options)
+            self._checks[name] = check
+            if schema.get("id"):
+                self._checks.setdefault(schema["id"], check)
+            if schema.get("type") == "title":
+                self.title_property = name
+
+    @staticmethod
+    def _compile(
+        name: str, schema: Dict[str, Any], strict_options: bool
+    ) -> Callable[[Any], Optional[str]]:
+        prop_type = schema.get("type", "")
+        if prop_type in _READ_ONLY_PROPERTY_TYPES:
+            return lambda value: f"{name!r} is a read-only {prop_type} property"
+        shape = _PROPERTY_VALUE_CHECKS.get(prop_type)
+        options: Optional[FrozenSet[str]] = None
+        if prop_type == "status" or (
+            strict_options and prop_type in ("select", "multi_select")
+        ):
+            options = frozenset(
+                key
+                for option in (schema.get(prop_type) or {}).get("options", [])
+                for key in (option.get("name"), option.get("id"))
+                if key
+            )
+
+        def check(value: Any) -> Optional[str]:
+            if not isinstance(value, dict) or prop_type not in value:
+                return f"{name!r} expects a {prop_type} value"
+            declared = value.get("type")
+            if declared is not None and declared != prop_type:
+                return f"{name!r} is {prop_type}, not {declared}"
+            inner = value[prop_type]
+            if shape is not None and not shape(inner):
+                return f"{name!r} has a malformed {prop_type} value"
+            if options is not None and inner is not None:
+                chosen = inner if isinstance(inner, list) else [inner]
+                for option in chosen:
+                    key = option.get("name") or option.get("id")
+                    if key not in options:
+                        return f"{name!r} has no option {key!r}"
+            return None
+
+        return check
+
+    def errors(self, properties: Dict[str, Any]) -> List[str]:
+        """Every problem with ``properties`` (empty when valid)."""
+        problems = []
+        for key, value in properties.items():
+            check = self._checks.get(key)
+            if check is None:
+                problems.append(f"unknown property {key!r}")
+                continue
+            problem = check(value)
+            if problem:
+                problems.append(problem)
+        return problems
+
+    def validate(self, properties: Dict[str, Any]) -> None:
+        problems = self.errors(properties)
+        if problems:
+            raise PropertyValidationError(self.database_id, problems)
+
+
+# -----------------------------------------------------------------------------
+# Write Coalescing
+# -----------------------------------------------------------------------------
+@dataclass
+class _PendingUpdate:
+    """update_page calls for one page merged while waiting to be sent."""
+    page_id: str
+    future: asyncio.Future
+    body: Dict[str, Any] = field(default_factory=dict)
+    callers: int = 0
+    timer: Optional[asyncio.TimerHandle] = None
+
+    def merge(self, body: Dict[str, Any]) -> None:
+        # Later calls win per property and per top-level field.
+        properties = body.get("properties")
+        if properties:
+            self.body.setdefault("properties", {}).update(properties)
+        for key, value in body.items():
+            if key != "properties":
+                self.body[key] = value
+        self.callers += 1
+
+
+# -----------------------------------------------------------------------------
+# Idempotent Creates
+# -----------------------------------------------------------------------------
+def _minute_floor(timestamp: float) -> str:
+    """UTC ISO time truncated to the minute (Notion's created_time precision)."""
+    moment = datetime.fromtimestamp(timestamp, timezone.utc)
+    moment = moment.replace(second=0, microsecond=0)
+    # Same shape as the API's timestamps so they compare as strings.
+    return moment.isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+def _written_title(properties: Dict[str, Any]) -> Optional[str]:
+    """Title text from a create payload's properties, if one is set."""
+    for value in properties.values():
+        if isinstance(value, dict) and "title" in value:
+            return "".join(
+                item.get("plain_text") or (item.get("text") or {}).get("content", "")
+                for item in value["title"] or []
+            )
+    return None
+
+
+def _page_title(page: Dict[str, Any]) -> str:
+    for prop in page.get("properties", {}).values():
+        if isinstance(prop, dict) and prop.get("type") == "title":
+            return _plain(prop.get("title"))
+    return ""
+
+
+class CreateJournal:
+    """
+    Append-only record of idempotency key -> created page.
+
+    ``begin`` is written before a create is sent and ``complete`` after it
+    succeeds, so a key left pending marks a create whose outcome is unknown
+    (timeout, crash). Each record is one JSON line flushed to disk; with no
+    ``path`` the journal only lives in memory. Later records for a key
+    override earlier ones when the file is replayed.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = os.path.expanduser(path) if path else None
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._claimed: Set[str] = set()  # page IDs already bound to a key
+        self._file = None
+        if self.path:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            if os.path.exists(self.path):
+                with open(self.path, encoding="utf-8") as f:
+                    for line in f:
+                        if line.strip():
+                            self._apply(json.loads(line))
+            self._file = open(self.path, "a", encoding="utf-8")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _apply(self, record: Dict[str, Any]) -> None:
+        if record.get("forgotten"):
+            entry = self._entries.pop(record["key"], None) or {}
+            if entry.get("page_id"):
+                self._claimed.discard(_normalize_id(entry["page_id"]))
+            return
+        entry = self._entries.setdefault(record["key"], {})
+        entry.update(record)
+        if entry.get("page_id"):
+            self._claimed.add(_normalize_id(entry["page_id"]))
+
+    def _append(self, record: Dict[str, Any]) -> None:
+        self._apply(record)
+        if self._file is not None:
+            self._file.write(json.dumps(record) + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self._entries.get(key)
+
+    def is_claimed(self, page_id: str) -> bool:
+        return _normalize_id(page_id) in self._claimed
+
+    def begin(self, key: str, parent_type: str, parent_id: str, title: str) -> None:
+        """Record that a create for ``key`` is about to be sent."""
+        entry = self._entries.get(key)
+        if entry is not None and entry.get("started_at"):
+            return  # keep the first attempt's time for recovery lookups
+        self._append(
+            {
+                "key": key,
+                "state": "pending",
+                "parent_type": parent_type,
+                "parent_id": parent_id,
+                "title": title,
+                "started_at": time.time(),
+            }
+        )
+
+    def complete(self, key: str, page_id: str) -> None:
+        self._append({"key": key, "state": "done", "page_id": page_id})
+
+    def mark(self, key: str, step: str) -> None:
+        """Record a follow-up step (e.g. appended content) as done for ``key``."""
+        steps = sorted({*self._entries.get(key, {}).get("steps", []), step})
+        self._append({"key": key, "steps": steps})
+
+    def forget(self, key: str) -> None:
+        """Drop ``key`` once its create can no longer be retried."""
+        if key in self._entries:
+            self._append({"key": key, "forgotten": True})
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
 
 
 # -----------------------------------------------------------------------------
@@ -68,7 +1608,24 @@ class ToolResult:
 class NotionClient:
     """Full-featured Notion API client with all CRUD operations."""
 
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        tree_concurrency: int = 4,
+        cache: Optional[ResponseCache] = None,
+        store: Optional[ContentStore] = None,
+        connection: Optional[ConnectionConfig] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        journal: Optional[CreateJournal] = None,
+        single_flight: bool = True,
+        metrics: Optional[Metrics] = None,
+        validate_properties: bool = True,
+        strict_options: bool = False,
+        write_behind_s: Optional[float] = None,
+    ):
         self.api_key = api_key or os.getenv("NOTION_API_KEY")
         if not self.api_key:
             raise ValueError("NOTION_API_KEY is required")
@@ -78,81 +1635,454 @@ class NotionClient:
             "Content-Type": "application/json",
         }
         self._client: Optional[httpx.AsyncClient] = None
+        self.connection = connection or ConnectionConfig()
+        self._transport = transport
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.retry_count = 0
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+        self.journal = journal if journal is not None else CreateJournal()
+        self._creating: Dict[str, asyncio.Future] = {}
+        self.tree_concurrency = tree_concurrency
+        self.single_flight = single_flight
+        self._inflight: Dict[Tuple, asyncio.Future] = {}
+        self.coalesced_count = 0
+        self.cache = cache
+        self.store = store
+        self.metrics = metrics or Metrics()
+        self.validate_properties = validate_properties
+        self.strict_options = strict_options
+        self._schemas: Dict[str, SchemaValidator] = {}
+        self._page_databases: Dict[str, str] = {}  # page id -> parent database id
+        # update_page calls within this window are merged into one PATCH.
+        self.write_behind_s = write_behind_s
+        self._pending_updates: Dict[str, _PendingUpdate] = {}
+        self._flushing: Set[asyncio.Future] = set()
+        self.coalesced_writes = 0
+
+    @property
+    def transport(self) -> httpx.AsyncBaseTransport:
+        """Connection pool shared by every HTTP client this NotionClient hands out."""
+        if self._transport is None:
+            self._transport = httpx.AsyncHTTPTransport(
+                limits=self.connection.limits(),
+                http2=self.connection.http2,
+            )
+        return self._transport
+
+    def http_client(self, **kwargs: Any) -> httpx.AsyncClient:
+        """
+        Build an AsyncClient on the shared pool (e.g. for non-Notion hosts).
+
+        The client does not own the pool; close the NotionClient to release it.
+        """
+        kwargs.setdefault("timeout", self.connection.timeout())
+        return httpx.AsyncClient(transport=self.transport, **kwargs)
 
     async def _get_client(self) -> httpx.AsyncClient:
         if self._client is None:
-            self._client = httpx.AsyncClient(headers=self.headers, timeout=30.0)
+            self._client = self.http_client(headers=self.headers)
         return self._client
 
     async def close(self):
-        if self._client:
-            await self._client.aclose()
-            self._client = None
+        await self.flush()
+        self.circuit_breaker.close()
+        # Clients from http_client() share the transport; closing it closes them.
+        self._client = None
+        if self._transport is not None:
+            await self._transport.aclose()
+            self._transport = None
+
+    @property
+    def queue_depth(self) -> int:
+        """Requests waiting on the rate limiter."""
+        return self.rate_limiter.queue_depth
+
+    @property
+    def throttle_wait_s(self) -> float:
+        """Total seconds requests have spent waiting on the rate limiter."""
+        return self.rate_limiter.total_wait_s
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        *,
+        params: Optional[Dict[str, Any]] = None,
+        body: Optional[Dict[str, Any]] = None,
+        idempotent: Optional[bool] = None,
+    ) -> Dict[str, Any]:
+        """
+        Send a request through the rate limiter with retries.
+
+        429s are always retried because Notion did not process the request.
+        Other retryable statuses and transport errors are only retried for
+        idempotent requests (GET/DELETE by default). Concurrent identical
+        GETs are coalesced into one request unless ``single_flight`` is off.
+
+        Waiting, sending and retrying all stop at the current ``deadline``
+        (DeadlineExceeded), and nothing is sent while the circuit breaker is
+        open (CircuitOpenError).
+        """
+        if idempotent is None:
+            idempotent = method in ("GET", "DELETE")
+        if method != "GET" or not self.single_flight:
+            return await self._send(method, path, params, body, idempotent)
+
+        # Identical concurrent reads share one in-flight request.
+        key = (path, tuple(sorted((params or {}).items())))
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(
+                self._send(method, path, params, body, idempotent)
+            )
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish_inflight(key, done))
+        else:
+            self.coalesced_count += 1
+        # Shielded so one cancelled waiter doesn't cancel the others' request.
+        try:
+            return await _bounded(asyncio.shield(task))
+        except DeadlineExceeded:
+            remaining = remaining_time()
+            if not task.done() or remaining is None or remaining <= 0:
+                raise
+        # The shared request ran out of its creator's (shorter) deadline.
+        return await self._send(method, path, params, body, idempotent)
+
+    def _finish_inflight(self, key: Tuple, task: asyncio.Future) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved even if every waiter went away
+
+    async def _send(
+        self,
+        method: str,
+        path: str,
+        params: Optional[Dict[str, Any]],
+        body: Optional[Dict[str, Any]],
+        idempotent: bool,
+    ) -> Dict[str, Any]:
+        client = await self._get_client()
+        policy = self.retry_policy
+        metrics = self.metrics
+        url = f"{NOTION_BASE_URL}{path}"
+        endpoint = _endpoint_name(method, path)
+
+        breaker = self.circuit_breaker
+        attempt = 0
+        while True:
+            breaker.check()
+            waited = await _bounded(self.rate_limiter.acquire())
+            metrics.observe("throttle", endpoint, waited)
+            start = time.perf_counter()
+            try:
+                response = await _bounded(
+                    client.request(method, url, params=params, json=body)
+                )
+            except DeadlineExceeded:
+                # The caller's own time ran out; not a sign the API is down.
+                metrics.observe(
+                    "request", endpoint, time.perf_counter() - start, error=True
+                )
+                raise
+            except httpx.TransportError:
+                metrics.observe(
+                    "request", endpoint, time.perf_counter() - start, error=True
+                )
+                breaker.record_failure(self._probe)
+                if not idempotent or attempt >= policy.max_retries:
+                    raise
+                delay = policy.backoff(attempt)
+            else:
+                status = response.status_code
+                if status >= 500:
+                    breaker.record_failure(self._probe)
+                elif status != 429:
+                    breaker.record_success()
+                metrics.observe(
+                    "request",
+                    endpoint,
+                    time.perf_counter() - start,
+                    error=status >= 400,
+                    bytes_in=len(response.content),
+                    bytes_out=len(response.request.content),
+                )
+                retryable = status == 429 or (
+                    idempotent and status in policy.retry_statuses
+                )
+                if not retryable or attempt >= policy.max_retries:
+                    response.raise_for_status()
+                    return response.json()
+                delay = _retry_after_seconds(response)
+                if delay is None:
+                    delay = policy.backoff(attempt)
+                if status == 429:
+                    # Pause the shared bucket; the retry waits in acquire().
+                    self.rate_limiter.pause(delay)
+                    delay = 0.0
+
+            attempt += 1
+            self.retry_count += 1
+            metrics.record_retry("request", endpoint)
+            if delay:
+                remaining = remaining_time()
+                if remaining is not None and delay >= remaining:
+                    raise DeadlineExceeded(f"Deadline exceeded before retrying {endpoint}")
+                await asyncio.sleep(delay)
+
+    async def _probe(self) -> None:
+        """Health check used by the circuit breaker while it is open."""
+        client = await self._get_client()
+        await self.rate_limiter.acquire()
+        response = await client.get(f"{NOTION_BASE_URL}/users/me")
+        if response.status_code >= 500:
+            response.raise_for_status()
 
     # -------------------------------------------------------------------------
     # READ Operations
     # -------------------------------------------------------------------------
+    async def _cached_object(self, kind: str, object_id: str, path: str) -> Dict[str, Any]:
+        """GET a single page/database through the response cache and store."""
+        key = (kind, _normalize_id(object_id))
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        if self.store is not None:
+            stored = self.store.get(kind, object_id)
+            if stored is not None and stored.is_fresh(self.store.fresh_s):
+                self._remember(
+                    key, kind, object_id, stored.data, [],
+                    stored.last_edited_time, persist=False,
+                )
+                return stored.data
+
+        result = await self._request("GET", path)
+        self._remember(key, kind, object_id, result, [], result.get("last_edited_time"))
+        return result
+
+    def _remember(
+        self,
+        key: Tuple,
+        kind: str,
+        object_id: str,
+        value: Any,
+        member_ids: List[str],
+        last_edited_time: Optional[str],
+        persist: bool = True,
+    ) -> None:
+        """Write a fetched object to whichever cache tiers are enabled."""
+        if self.cache is not None:
+            self.cache.set(key, value, [object_id, *member_ids], last_edited_time)
+        if persist and self.store is not None:
+            self.store.put(kind, object_id, value, last_edited_time, member_ids)
+
+    def invalidate(self, *object_ids: str) -> None:
+        """Drop cached and stored copies of objects (e.g. after an outside edit)."""
+        for object_id in object_ids:
+            if self.cache is not None:
+                self.cache.invalidate(object_id)
+            if self.store is not None:
+                self.store.invalidate(object_id)
+
     async def get_page(self, page_id: str) -> Dict[str, Any]:
         """Retrieve a page by ID."""
-        client = await self._get_client()
-        response = await client.get(f"{NOTION_BASE_URL}/pages/{page_id}")
-        response.raise_for_status()
-        return response.json()
+        page = await self._cached_object("page", page_id, f"/pages/{page_id}")
+        self._learn_parent(page)
+        return page
 
     async def get_database(self, database_id: str) -> Dict[str, Any]:
         """Retrieve a database by ID."""
-        client = await self._get_client()
-        response = await client.get(f"{NOTION_BASE_URL}/databases/{database_id}")
-        response.raise_for_status()
-        return response.json()
+        database = await self._cached_object(
+            "database", database_id, f"/databases/{database_id}"
+        )
+        self._learn_schema(database)
+        return database
 
     async def get_block(self, block_id: str) -> Dict[str, Any]:
         """Retrieve a block by ID."""
-        client = await self._get_client()
-        response = await client.get(f"{NOTION_BASE_URL}/blocks/{block_id}")
-        response.raise_for_status()
-        return response.json()
+        return await self._request("GET", f"/blocks/{block_id}")
 
     async def get_block_children(
         self, block_id: str, start_cursor: Optional[str] = None, page_size: int = 100
     ) -> Dict[str, Any]:
         """Get child blocks of a block or page."""
-        client = await self._get_client()
-        params = {"page_size": page_size}
+        params: Dict[str, Any] = {"page_size": page_size}
         if start_cursor:
             params["start_cursor"] = start_cursor
-        response = await client.get(
-            f"{NOTION_BASE_URL}/blocks/{block_id}/children", params=params
+        return await self._request(
+            "GET", f"/blocks/{block_id}/children", params=params
         )
-        response.raise_for_status()
-        return response.json()
 
-    async def get_page_content(self, page_id: str) -> str:
-        """Get full text content of a page."""
-        blocks = []
-        cursor = None
-        while True:
-            result = await self.get_block_children(page_id, cursor)
-            blocks.extend(result.get("results", []))
-            if not result.get("has_more"):
-                break
-            cursor = result.get("next_cursor")
+    async def get_block_tree(
+        self,
+        block_id: str,
+        max_concurrency: Optional[int] = None,
+        max_depth: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Fetch every descendant of a block or page.
+
+        Blocks with ``has_children`` get a ``children`` list. Sibling subtrees
+        are fetched concurrently (bounded by ``max_concurrency``), so a page
+        loads in roughly tree-depth round trips. Child pages and databases are
+        separate documents and are not descended into.
+
+        With a cache or store enabled, a known-but-expired tree is
+        revalidated by comparing the root's ``last_edited_time`` (one
+        request) before refetching. Only full trees are persisted.
+        """
+        key = ("tree", _normalize_id(block_id), max_depth)
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        # A previously fetched tree that may still be current.
+        known: Optional[Tuple[Any, Optional[str]]] = None
+        if self.cache is not None and self.cache.revalidate:
+            entry = self.cache.peek_stale(key)
+            if entry is not None:
+                known = (entry.value, entry.last_edited_time)
+        persist = self.store is not None and max_depth is None
+        if known is None and persist:
+            stored = self.store.get("tree", block_id)
+            if stored is not None:
+                if stored.is_fresh(self.store.fresh_s):
+                    self._remember_tree(
+                        key, block_id, stored.data, stored.last_edited_time, False
+                    )
+                    return stored.data
+                known = (stored.data, stored.last_edited_time)
+
+        if known is not None:
+            root = await self._request("GET", f"/blocks/{block_id}")
+            edited = root.get("last_edited_time")
+            if edited and known[1] == edited:
+                if self.cache is not None and self.cache.peek_stale(key) is not None:
+                    self.cache.refresh(key)
+                else:
+                    self._remember_tree(key, block_id, known[0], edited, False)
+                if persist:
+                    self.store.touch("tree", block_id)
+                return known[0]
+            tree = await self._fetch_block_tree(block_id, max_concurrency, max_depth)
+        elif persist or (self.cache is not None and self.cache.revalidate):
+            # Record the root's edit time alongside the first fetch.
+            root, tree = await asyncio.gather(
+                self._request("GET", f"/blocks/{block_id}"),
+                self._fetch_block_tree(block_id, max_concurrency, max_depth),
+            )
+            edited = root.get("last_edited_time")
+        else:
+            tree = await self._fetch_block_tree(block_id, max_concurrency, max_depth)
+            edited = None
 
+        self._remember_tree(key, block_id, tree, edited, persist)
+        return tree
+
+    def _remember_tree(
+        self,
+        key: Tuple,
+        block_id: str,
+        tree: List[Dict[str, Any]],
+        last_edited_time: Optional[str],
+        persist: bool,
+    ) -> None:
+        self._remember(
+            key, "tree", block_id, tree, _tree_ids(tree), last_edited_time, persist
+        )
+
+    async def _fetch_block_tree(
+        self,
+        block_id: str,
+        max_concurrency: Optional[int],
+        max_depth: Optional[int],
+    ) -> List[Dict[str, Any]]:
+        semaphore = asyncio.Semaphore(max_concurrency or self.tree_concurrency)
+
+        async def fetch(parent_id: str, depth: int) -> List[Dict[str, Any]]:
+            async with semaphore:
+                children = [b async for b in self.iter_block_children(parent_id)]
+            if max_depth is not None and depth >= max_depth:
+                return children
+            nested = [b for b in children if _has_fetchable_children(b)]
+            subtrees = iter(
+                await asyncio.gather(
+                    *(fetch(_children_source_id(b), depth + 1) for b in nested)
+                )
+            )
+            # New dicts: coalesced GETs hand every waiter the same response
+            # objects, so attaching children in place would leak between
+            # concurrent fetches of the same blocks.
+            return [
+                {**b, "children": next(subtrees)} if _has_fetchable_children(b) else b
+                for b in children
+            ]
+
+        return await fetch(block_id, 0)
+
+    async def get_page_content(self, page_id: str, recursive: bool = True) -> str:
+        """Get full text content of a page, including nested blocks."""
+        if recursive:
+            blocks = await self.get_block_tree(page_id)
+        else:
+            blocks = [block async for block in self.iter_block_children(page_id)]
         return self._blocks_to_text(blocks)
 
+    async def iter_page_text(
+        self, page_id: str, recursive: bool = True
+    ) -> AsyncIterator[str]:
+        """
+        Stream a page's text line by line as its blocks arrive.
+
+        Top-level blocks are paged in lazily; with ``recursive`` the subtrees
+        of the next few nested blocks are fetched ahead in the background so
+        output stays in document order without waiting on each round trip.
+        """
+        lookahead: "asyncio.Queue[Tuple[Dict[str, Any], Optional[asyncio.Future]]]"
+        lookahead = asyncio.Queue(maxsize=self.tree_concurrency)
+
+        async def produce() -> None:
+            async for block in self.iter_block_children(page_id):
+                subtree = None
+                if recursive and _has_fetchable_children(block):
+                    subtree = asyncio.ensure_future(
+                        self.get_block_tree(_children_source_id(block))
+                    )
+                await lookahead.put((block, subtree))
+            await lookahead.put(({}, None))
+
+        producer = asyncio.ensure_future(produce())
+        try:
+            while True:
+                getter = asyncio.ensure_future(lookahead.get())
+                await asyncio.wait(
+                    {getter, producer}, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not getter.done() and producer.exception() is not None:
+                    getter.cancel()
+                    producer.result()  # re-raise the listing error
+                block, subtree = await getter
+                if not block:
+                    break
+                if subtree is not None:
+                    block = {**block, "children": await subtree}
+                for line in iter_text_lines([block]):
+                    yield line
+        finally:
+            producer.cancel()
+            while not lookahead.empty():
+                _, subtree = lookahead.get_nowait()
+                if subtree is not None:
+                    subtree.cancel()
+
     def _blocks_to_text(self, blocks: List[Dict]) -> str:
         """Convert blocks to plain text."""
-        lines = []
-        for block in blocks:
-            block_type = block.get("type", "")
-            block_data = block.get(block_type, {})
-            if "rich_text" in block_data:
-                text = "".join(
-                    item.get("plain_text", "") for item in block_data["rich_text"]
-                )
-                if text:
-                    lines.append(text)
-        return "\n".join(lines)
+        with self.metrics.timer("convert", "blocks_to_text"):
+            return blocks_to_text(blocks)
 
     # -------------------------------------------------------------------------
     # SEARCH Operations
@@ -167,7 +2097,6 @@ class NotionClient:
         start_cursor: Optional[str] = None,
     ) -> Dict[str, Any]:
         """Search across the workspace."""
-        client = await self._get_client()
         body: Dict[str, Any] = {
             "page_size": page_size,
             "sort": {"direction": sort_direction, "timestamp": sort_timestamp},
@@ -179,9 +2108,7 @@ class NotionClient:
         if start_cursor:
             body["start_cursor"] = start_cursor
 
-        response = await client.post(f"{NOTION_BASE_URL}/search", json=body)
-        response.raise_for_status()
-        return response.json()
+        return await self._request("POST", "/search", body=body, idempotent=True)
 
     async def query_database(
         self,
@@ -192,7 +2119,6 @@ class NotionClient:
         start_cursor: Optional[str] = None,
     ) -> Dict[str, Any]:
         """Query a database with filters and sorts."""
-        client = await self._get_client()
         body: Dict[str, Any] = {"page_size": page_size}
         if filter_obj:
             body["filter"] = filter_obj
@@ -201,15 +2127,157 @@ class NotionClient:
         if start_cursor:
             body["start_cursor"] = start_cursor
 
-        response = await client.post(
-            f"{NOTION_BASE_URL}/databases/{database_id}/query", json=body
+        result = await self._request(
+            "POST", f"/databases/{database_id}/query", body=body, idempotent=True
+        )
+        for row in result.get("results", []):
+            self._learn_parent(row)
+        return result
+
+    # -------------------------------------------------------------------------
+    # STREAMING Pagination
+    # -------------------------------------------------------------------------
+    async def _paginate(
+        self,
+        fetch: Callable[[Optional[str]], Awaitable[Dict[str, Any]]],
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield results across cursor pages.
+
+        The next page is requested as soon as the current one arrives, so the
+        network round trip overlaps with the caller processing items. At most
+        two pages are held in memory at a time.
+        """
+        if limit is not None and limit <= 0:
+            return
+        yielded = 0
+        pending: Optional[asyncio.Future] = asyncio.ensure_future(fetch(None))
+        try:
+            while pending is not None:
+                page = await pending
+                pending = None
+                results = page.get("results", [])
+                cursor = page.get("next_cursor")
+                wants_more = limit is None or yielded + len(results) < limit
+                if page.get("has_more") and cursor and wants_more:
+                    pending = asyncio.ensure_future(fetch(cursor))
+                for item in results:
+                    yield item
+                    yielded += 1
+                    if limit is not None and yielded >= limit:
+                        return
+        finally:
+            if pending is not None and not pending.done():
+                pending.cancel()
+
+    @staticmethod
+    def _page_size_for(limit: Optional[int], page_size: int) -> int:
+        if limit is not None and limit > 0:
+            return min(page_size, limit)
+        return page_size
+
+    def iter_search(
+        self,
+        query: str = "",
+        filter_type: Optional[str] = None,
+        sort_direction: str = "descending",
+        sort_timestamp: str = "last_edited_time",
+        page_size: int = 100,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream every search result across all pages."""
+        size = self._page_size_for(limit, page_size)
+        return self._paginate(
+            lambda cursor: self.search(
+                query=query,
+                filter_type=filter_type,
+                sort_direction=sort_direction,
+                sort_timestamp=sort_timestamp,
+                page_size=size,
+                start_cursor=cursor,
+            ),
+            limit,
+        )
+
+    def iter_query_database(
+        self,
+        database_id: str,
+        filter_obj: Optional[Dict] = None,
+        sorts: Optional[List[Dict]] = None,
+        page_size: int = 100,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream every row matching a database query."""
+        size = self._page_size_for(limit, page_size)
+        return self._paginate(
+            lambda cursor: self.query_database(
+                database_id,
+                filter_obj=filter_obj,
+                sorts=sorts,
+                page_size=size,
+                start_cursor=cursor,
+            ),
+            limit,
+        )
+
+    def iter_block_children(
+        self, block_id: str, page_size: int = 100, limit: Optional[int] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream the direct children of a block or page."""
+        size = self._page_size_for(limit, page_size)
+        return self._paginate(
+            lambda cursor: self.get_block_children(block_id, cursor, size),
+            limit,
+        )
+
+    def iter_users(
+        self, page_size: int = 100, limit: Optional[int] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream every user in the workspace."""
+        size = self._page_size_for(limit, page_size)
+        return self._paginate(
+            lambda cursor: self.get_users(cursor, size),
+            limit,
         )
-        response.raise_for_status()
-        return response.json()
 
     # -------------------------------------------------------------------------
     # WRITE Operations - Pages
     # -------------------------------------------------------------------------
+    async def schema_validator(self, database_id: str) -> SchemaValidator:
+        """Compiled validator for a database, fetching its schema once."""
+        validator = self._schemas.get(_normalize_id(database_id))
+        if validator is None:
+            await self.get_database(database_id)
+            validator = self._schemas[_normalize_id(database_id)]
+        return validator
+
+    def _learn_schema(self, database: Dict[str, Any]) -> None:
+        if database.get("object") != "database" or "properties" not in database:
+            return
+        key = _normalize_id(database["id"])
+        current = self._schemas.get(key)
+        edited = database.get("last_edited_time")
+        if current is None or current.last_edited_time != edited or edited is None:
+            self._schemas[key] = SchemaValidator(database, self.strict_options)
+
+    def _learn_parent(self, page: Dict[str, Any]) -> None:
+        database_id = (page.get("parent") or {}).get("database_id")
+        if database_id and page.get("id"):
+            self._page_databases[_normalize_id(page["id"])] = database_id
+
+    async def _checked_write(
+        self, database_id: Optional[str], request: Awaitable[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Await a page write; a 400 drops the schema in case it has drifted."""
+        try:
+            return await request
+        except httpx.HTTPStatusError as e:
+            if database_id and e.response.status_code == 400:
+                self._schemas.pop(_normalize_id(database_id), None)
+                self.invalidate(database_id)
+            raise
+
     async def create_page(
         self,
         parent_type: str,  # "page_id" or "database_id"
@@ -219,18 +2287,34 @@ class NotionClient:
         children: Optional[List[Dict]] = None,
         icon: Optional[Dict] = None,
         cover: Optional[Dict] = None,
+        idempotency_key: Optional[str] = None,
     ) -> Dict[str, Any]:
-        """Create a new page."""
-        client = await self._get_client()
-
+        """
+        Create a new page.
+
+        Properties for a database parent are checked against its cached
+        schema first (see ``validate_properties``); invalid payloads raise
+        PropertyValidationError without a request being sent.
+
+        With an ``idempotency_key`` the create goes through ``journal``: a
+        key that already produced a page returns that page, and timeouts or
+        5xx responses are retried only after checking the parent for a page
+        the failed attempt may have created.
+        """
         body: Dict[str, Any] = {"parent": {parent_type: parent_id}}
 
         # Set title based on parent type
         if parent_type == "database_id":
             # For database pages, title goes in properties
-            body["properties"] = properties or {}
-            if "title" not in body["properties"] and "Name" not in body["properties"]:
-                body["properties"]["Name"] = {"title": [{"text": {"content": title}}]}
+            body["properties"] = dict(properties or {})
+            validator = None
+            if self.validate_properties:
+                validator = await self.schema_validator(parent_id)
+            title_key = (validator and validator.title_property) or "Name"
+            if "title" not in body["properties"] and title_key not in body["properties"]:
+                body["properties"][title_key] = {"title": [{"text": {"content": title}}]}
+            if validator is not None:
+                validator.validate(body["properties"])
         else:
             # For regular pages, title is a property
             body["properties"] = properties or {
@@ -244,9 +2328,190 @@ class NotionClient:
         if cover:
             body["cover"] = cover
 
-        response = await client.post(f"{NOTION_BASE_URL}/pages", json=body)
-        response.raise_for_status()
-        return response.json()
+        if idempotency_key is not None:
+            created_title = _written_title(body["properties"])
+            return await self._create_once(
+                idempotency_key,
+                parent_type,
+                parent_id,
+                title if created_title is None else created_title,
+                body,
+            )
+        return await self._post_page(parent_type, parent_id, body)
+
+    async def _post_page(
+        self, parent_type: str, parent_id: str, body: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        page = await self._checked_write(
+            parent_id if parent_type == "database_id" else None,
+            self._request("POST", "/pages", body=body),
+        )
+        self._learn_parent(page)
+        return page
+
+    async def _create_once(
+        self,
+        key: str,
+        parent_type: str,
+        parent_id: str,
+        title: str,
+        body: Dict[str, Any],
+        kind: str = "page",
+    ) -> Dict[str, Any]:
+        # Concurrent calls with the same key share one attempt.
+        task = self._creating.get(key)
+        if task is None:
+            task = asyncio.ensure_future(
+                self._create_journaled(key, parent_type, parent_id, title, body, kind)
+            )
+            self._creating[key] = task
+            task.add_done_callback(lambda _: self._creating.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _create_journaled(
+        self,
+        key: str,
+        parent_type: str,
+        parent_id: str,
+        title: str,
+        body: Dict[str, Any],
+        kind: str = "page",
+    ) -> Dict[str, Any]:
+        """Create a page (or, with ``kind="database"``, a database) once per key."""
+        journal = self.journal
+        entry = journal.get(key)
+        if entry and entry.get("page_id"):
+            if kind == "database":
+                return await self.get_database(entry["page_id"])
+            return await self.get_page(entry["page_id"])
+        if entry:
+            # An earlier attempt's outcome is unknown; look before re-creating.
+            found = await self._find_created(entry, kind)
+            if found is not None:
+                journal.complete(key, found["id"])
+                return found
+
+        journal.begin(key, parent_type, parent_id, title)
+        policy = self.retry_policy
+        attempt = 0
+        while True:
+            try:
+                if kind == "database":
+                    page = await self._post_database(body)
+                else:
+                    page = await self._post_page(parent_type, parent_id, body)
+                break
+            except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                if not _is_ambiguous(e) or attempt >= policy.max_retries:
+                    raise
+                found = await self._find_created(journal.get(key), kind)
+                if found is not None:
+                    page = found
+                    break
+                await asyncio.sleep(policy.backoff(attempt))
+                attempt += 1
+                self.retry_count += 1
+        journal.complete(key, page["id"])
+        return page
+
+    async def _find_created(
+        self, entry: Dict[str, Any], kind: str = "page"
+    ) -> Optional[Dict[str, Any]]:
+        """Find an unclaimed page (or database) matching a pending journal entry."""
+        since = _minute_floor(entry["started_at"])
+        parent_id = entry["parent_id"]
+        if entry["parent_type"] == "database_id":
+            recent = {"timestamp": "created_time", "created_time": {"on_or_after": since}}
+            rows = self.iter_query_database(parent_id, filter_obj=recent)
+            async for row in rows:
+                if (
+                    row.get("created_time", "") >= since
+                    and _page_title(row) == entry["title"]
+                    and not self.journal.is_claimed(row["id"])
+                ):
+                    return row
+            return None
+        block_type = "child_database" if kind == "database" else "child_page"
+        async for block in self.iter_block_children(parent_id):
+            if (
+                block.get("type") == block_type
+                and block.get("created_time", "") >= since
+                and block[block_type].get("title") == entry["title"]
+                and not self.journal.is_claimed(block["id"])
+            ):
+                if kind == "database":
+                    return await self.get_database(block["id"])
+                return await self.get_page(block["id"])
+        return None
+
+    def create_pages_bulk(
+        self,
+        specs: Iterable[Dict[str, Any]],
+        concurrency: int = 8,
+        max_attempts: int = 3,
+    ) -> AsyncIterator[ToolResult]:
+        """
+        Create many pages concurrently.
+
+        Each spec holds ``create_page`` keyword arguments. Yields one
+        ToolResult per spec, in completion order, with ``index`` set.
+        Creates are journaled as described in ``_keyed_bulk``.
+        """
+        return self._keyed_bulk(
+            specs,
+            lambda spec: self.create_page(**spec),
+            "create_page",
+            concurrency,
+            max_attempts,
+        )
+
+    def _keyed_bulk(
+        self,
+        specs: Iterable[Dict[str, Any]],
+        create: Callable[[Dict[str, Any]], Awaitable[Any]],
+        tool_name: str,
+        concurrency: int,
+        max_attempts: int,
+    ) -> AsyncIterator[ToolResult]:
+        """
+        Run journaled creates over ``specs`` through ``_run_bulk``.
+
+        Specs without an ``idempotency_key`` get one for this call only
+        (batch ID plus index), so retrying a failed item never creates its
+        page twice; those keys are forgotten when the batch ends. Pass an
+        ``idempotency_key`` to make a create safe across batches and runs.
+        Timeouts and 5xx responses are already retried (after checking for
+        the page) inside ``create_page``, so items are not re-run for them.
+        """
+        journal = self.journal
+        batch = uuid.uuid4().hex
+        batch_keys: List[str] = []
+
+        def keyed() -> Iterator[Dict[str, Any]]:
+            for index, spec in enumerate(specs):
+                if "idempotency_key" not in spec:
+                    key = f"bulk:{batch}:{index}"
+                    batch_keys.append(key)
+                    spec = {**spec, "idempotency_key": key}
+                yield spec
+
+        async def run() -> AsyncIterator[ToolResult]:
+            try:
+                async for result in _run_bulk(
+                    keyed(),
+                    create,
+                    tool_name,
+                    concurrency,
+                    max_attempts,
+                    self.retry_policy,
+                    retry_if=lambda e: not _is_ambiguous(e),
+                ):
+                    yield result
+            finally:
+                for key in batch_keys:
+                    journal.forget(key)
+
+        return run()
 
     async def update_page(
         self,
@@ -256,10 +2521,21 @@ class NotionClient:
         icon: Optional[Dict] = None,
         cover: Optional[Dict] = None,
     ) -> Dict[str, Any]:
-        """Update a page's properties."""
-        client = await self._get_client()
+        """
+        Update a page's properties.
+
+        When the page's parent database is known (from an earlier read or
+        create), properties are validated against its schema first.
+
+        With ``write_behind_s`` set, updates to the same page within that
+        window are merged (later values win) and sent as one PATCH; every
+        caller receives the resulting page.
+        """
         body: Dict[str, Any] = {}
+        database_id = self._page_databases.get(_normalize_id(page_id))
         if properties:
+            if self.validate_properties and database_id:
+                (await self.schema_validator(database_id)).validate(properties)
             body["properties"] = properties
         if archived is not None:
             body["archived"] = archived
@@ -268,9 +2544,64 @@ class NotionClient:
         if cover:
             body["cover"] = cover
 
-        response = await client.patch(f"{NOTION_BASE_URL}/pages/{page_id}", json=body)
-        response.raise_for_status()
-        return response.json()
+        if self.write_behind_s:
+            return await self._defer_update(page_id, body)
+        return await self._patch_page(page_id, body)
+
+    async def _patch_page(self, page_id: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        database_id = self._page_databases.get(_normalize_id(page_id))
+        result = await self._checked_write(
+            database_id if body.get("properties") else None,
+            self._request("PATCH", f"/pages/{page_id}", body=body, idempotent=True),
+        )
+        self.invalidate(page_id)
+        return result
+
+    async def _defer_update(self, page_id: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        key = _normalize_id(page_id)
+        pending = self._pending_updates.get(key)
+        if pending is None:
+            loop = asyncio.get_running_loop()
+            pending = _PendingUpdate(page_id, loop.create_future())
+            pending.timer = loop.call_later(
+                self.write_behind_s, self._start_flush, key
+            )
+            self._pending_updates[key] = pending
+        else:
+            self.coalesced_writes += 1
+        pending.merge(body)
+        # Shielded so one cancelled caller doesn't fail the shared write.
+        return await asyncio.shield(pending.future)
+
+    def _start_flush(self, key: str) -> Optional[asyncio.Future]:
+        pending = self._pending_updates.pop(key, None)
+        if pending is None:
+            return None
+        if pending.timer is not None:
+            pending.timer.cancel()
+        task = asyncio.ensure_future(self._send_pending(pending))
+        self._flushing.add(task)
+        task.add_done_callback(self._flushing.discard)
+        return task
+
+    async def _send_pending(self, pending: _PendingUpdate) -> None:
+        try:
+            result = await self._patch_page(pending.page_id, pending.body)
+        except Exception as e:
+            if not pending.future.done():
+                pending.future.set_exception(e)
+                pending.future.exception()  # callers may all have gone away
+        else:
+            if not pending.future.done():
+                pending.future.set_result(result)
+
+    async def flush(self, page_id: Optional[str] = None) -> None:
+        """Send buffered page updates now (all pages, or just ``page_id``)."""
+        keys = [_normalize_id(page_id)] if page_id else list(self._pending_updates)
+        started = {task for task in map(self._start_flush, keys) if task is not None}
+        waiting = started if page_id else set(self._flushing)
+        if waiting:
+            await asyncio.wait(waiting)
 
     async def archive_page(self, page_id: str) -> Dict[str, Any]:
         """Archive (soft delete) a page."""
@@ -284,34 +2615,98 @@ class NotionClient:
     # WRITE Operations - Blocks
     # -------------------------------------------------------------------------
     async def append_blocks(
-        self, parent_id: str, children: List[Dict]
+        self, parent_id: str, children: List[Dict], after: Optional[str] = None
     ) -> Dict[str, Any]:
-        """Append child blocks to a page or block."""
-        client = await self._get_client()
-        body = {"children": children}
-        response = await client.patch(
-            f"{NOTION_BASE_URL}/blocks/{parent_id}/children", json=body
-        )
-        response.raise_for_status()
-        return response.json()
+        """
+        Append child blocks to a page or block.
+
+        Payloads beyond Notion's per-request limits (100 children, two levels
+        of nesting) are split into chunks. Each chunk is anchored ``after`` the
+        last block of the previous one so order holds, and over-nested children
+        are appended to their created parents in the background while later
+        chunks keep flowing through the rate limiter.
+        """
+        results: List[Dict[str, Any]] = []
+        nested: List[asyncio.Future] = []
+        anchor = after
+        try:
+            for chunk in _plan_append_chunks(children):
+                body: Dict[str, Any] = {"children": [block for block, _ in chunk]}
+                if anchor:
+                    body["after"] = anchor
+                response = await self._request(
+                    "PATCH", f"/blocks/{parent_id}/children", body=body
+                )
+                created = response.get("results", [])
+                results.extend(created)
+                for (_, deferred), block in zip(chunk, created):
+                    if deferred:
+                        nested.append(
+                            asyncio.ensure_future(self.append_blocks(block["id"], deferred))
+                        )
+                if created:
+                    anchor = created[-1]["id"]
+            await asyncio.gather(*nested)
+        except BaseException:
+            for task in nested:
+                task.cancel()
+            raise
+        finally:
+            self.invalidate(parent_id)
+        return {"object": "list", "results": results}
 
     async def update_block(
         self, block_id: str, block_data: Dict[str, Any]
     ) -> Dict[str, Any]:
         """Update a block's content."""
-        client = await self._get_client()
-        response = await client.patch(
-            f"{NOTION_BASE_URL}/blocks/{block_id}", json=block_data
+        result = await self._request(
+            "PATCH", f"/blocks/{block_id}", body=block_data, idempotent=True
         )
-        response.raise_for_status()
-        return response.json()
+        self.invalidate(block_id)
+        return result
 
     async def delete_block(self, block_id: str) -> Dict[str, Any]:
         """Delete a block."""
-        client = await self._get_client()
-        response = await client.delete(f"{NOTION_BASE_URL}/blocks/{block_id}")
-        response.raise_for_status()
-        return response.json()
+        result = await self._request("DELETE", f"/blocks/{block_id}")
+        self.invalidate(block_id)
+        return result
+
+    async def sync_blocks(
+        self, parent_id: str, blocks: List[Dict]
+    ) -> Dict[str, int]:
+        """
+        Make a page's (or block's) children match ``blocks`` with minimal writes.
+
+        The current children are fetched fresh (bypassing the cache) and
+        diffed against ``blocks`` by content signature: unchanged blocks are
+        left alone, same-type changes become ``update_block`` calls, and only
+        the remainder is deleted or appended in position with ``after``. A
+        report that changes by a few lines costs a few requests. Child pages
+        and databases are never touched or moved. Returns counts of each kind
+        of edit.
+        """
+        tree = await self._fetch_block_tree(parent_id, None, None)
+        plan = _plan_block_sync(tree, blocks)
+        try:
+            await asyncio.gather(
+                *(self.update_block(block_id, body) for block_id, body in plan.updates),
+                *(
+                    self.append_blocks(parent_id, run, after=after)
+                    for after, run in plan.inserts
+                ),
+            )
+            # Inserts may be anchored on blocks that are about to go.
+            await asyncio.gather(
+                *(self.delete_block(block_id) for block_id in plan.deletes)
+            )
+        finally:
+            self.invalidate(parent_id)
+        return {
+            "kept": plan.kept,
+            "updated": len(plan.updates),
+            "deleted": len(plan.deletes),
+            "inserted": sum(len(run) for _, run in plan.inserts),
+        }
 
     # -------------------------------------------------------------------------
     # WRITE Operations - Databases
@@ -322,18 +2717,31 @@ class NotionClient:
         title: str,
         properties: Dict[str, Any],
         is_inline: bool = False,
+        idempotency_key: Optional[str] = None,
     ) -> Dict[str, Any]:
-        """Create a new database."""
-        client = await self._get_client()
+        """
+        Create a new database.
+
+        With an ``idempotency_key`` the create is journaled like
+        ``create_page``: a pending entry is recovered by looking for the
+        database under the parent before creating it again.
+        """
         body = {
             "parent": {"type": "page_id", "page_id": parent_page_id},
             "title": [{"type": "text", "text": {"content": title}}],
             "properties": properties,
             "is_inline": is_inline,
         }
-        response = await client.post(f"{NOTION_BASE_URL}/databases", json=body)
-        response.raise_for_status()
-        return response.json()
+        if idempotency_key is not None:
+            return await self._create_once(
+                idempotency_key, "page_id", parent_page_id, title, body, kind="database"
+            )
+        return await self._post_database(body)
+
+    async def _post_database(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        database = await self._request("POST", "/databases", body=body)
+        self._learn_schema(database)
+        return database
 
     async def update_database(
         self,
@@ -342,38 +2750,34 @@ class NotionClient:
         properties: Optional[Dict[str, Any]] = None,
     ) -> Dict[str, Any]:
         """Update database title or properties."""
-        client = await self._get_client()
         body: Dict[str, Any] = {}
         if title:
             body["title"] = [{"type": "text", "text": {"content": title}}]
         if properties:
             body["properties"] = properties
 
-        response = await client.patch(
-            f"{NOTION_BASE_URL}/databases/{database_id}", json=body
+        result = await self._request(
+            "PATCH", f"/databases/{database_id}", body=body, idempotent=True
         )
-        response.raise_for_status()
-        return response.json()
+        self.invalidate(database_id)
+        self._learn_schema(result)
+        return result
 
     # -------------------------------------------------------------------------
     # UTILITY Operations
     # -------------------------------------------------------------------------
-    async def get_users(self, start_cursor: Optional[str] = None) -> Dict[str, Any]:
+    async def get_users(
+        self, start_cursor: Optional[str] = None, page_size: int = 100
+    ) -> Dict[str, Any]:
         """List all users in the workspace."""
-        client = await self._get_client()
-        params = {}
+        params: Dict[str, Any] = {"page_size": page_size}
         if start_cursor:
             params["start_cursor"] = start_cursor
-        response = await client.get(f"{NOTION_BASE_URL}/users", params=params)
-        response.raise_for_status()
-        return response.json()
+        return await self._request("GET", "/users", params=params)
 
     async def get_me(self) -> Dict[str, Any]:
         """Get the bot user info."""
-        client = await self._get_client()
-        response = await client.get(f"{NOTION_BASE_URL}/users/me")
-        response.raise_for_status()
-        return response.json()
+        return await self._request("GET", "/users/me")
 
 
 # -----------------------------------------------------------------------------
@@ -591,6 +2995,162 @@ class PropertyBuilder:
         return {"status": {"name": status_name}}
 
 
+# -----------------------------------------------------------------------------
+# Speculative Prefetch
+# -----------------------------------------------------------------------------
+@dataclass
+class _Prefetch:
+    task: asyncio.Future
+    rank: int
+    started: float
+
+
+class Prefetcher:
+    """
+    Warms page content for the top hits of a search in the background.
+
+    After a ``search`` tool call, the first ``top_k`` page results are read
+    with ``get_page_content`` as background tasks (through the client's rate
+    limiter, so they also warm its cache). A later ``get_page_content`` for
+    one of them awaits that read instead of starting its own.
+
+    Prefetch is strictly lower priority than real calls: nothing is started
+    while requests are already queued on the limiter, and outstanding
+    prefetches are cancelled when another tool call arrives to a queued
+    limiter. Each search replaces the previous set, and results older than
+    ``ttl_s`` are not served.
+    """
+
+    def __init__(self, top_k: int = 3, ttl_s: float = 30.0):
+        if top_k < 1:
+            raise ValueError("top_k must be at least 1")
+        self.top_k = top_k
+        self.ttl_s = ttl_s
+        self._pending: Dict[str, _Prefetch] = {}
+        self.scheduled = 0
+        self.skipped = 0  # searches whose prefetch yielded to a busy limiter
+        self.hits = 0
+        self.hits_ready = 0  # hits whose content had already arrived
+        self.misses = 0
+        self.cancelled = 0
+        self.wasted = 0  # fetched but never asked for
+        self.failed = 0
+        self.rank_hits = [0] * top_k
+
+    def schedule(self, client: NotionClient, results: Dict[str, Any]) -> int:
+        """Start prefetching the top page hits of a search response."""
+        self.clear()
+        if client.queue_depth:
+            self.skipped += 1
+            return 0
+        pages = [r for r in results.get("results", []) if r.get("object") == "page"]
+        for rank, page in enumerate(pages[: self.top_k]):
+            task = asyncio.ensure_future(self._fetch(client, page["id"]))
+            task.add_done_callback(self._finish)
+            self._pending[_normalize_id(page["id"])] = _Prefetch(
+                task, rank, time.monotonic()
+            )
+        self.scheduled += len(self._pending)
+        return len(self._pending)
+
+    @staticmethod
+    async def _fetch(client: NotionClient, page_id: str) -> str:
+        # Not bound by the deadline of the search that triggered it.
+        _deadline.set(None)
+        return await client.get_page_content(page_id)
+
+    def _finish(self, task: asyncio.Future) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            self.failed += 1
+
+    def take(self, page_id: str) -> Optional[asyncio.Future]:
+        """
+        Claim the prefetch for ``page_id``, counting a hit or a miss.
+
+        Returns None when there is nothing usable (not prefetched, expired,
+        cancelled or failed); the caller then reads the page itself.
+        """
+        entry = self._pending.pop(_normalize_id(page_id), None)
+        task = entry.task if entry else None
+        if (
+            entry is None
+            or task.cancelled()
+            or (task.done() and task.exception() is not None)
+            or time.monotonic() - entry.started > self.ttl_s
+        ):
+            if entry is not None:
+                self._discard_entry(entry)
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.hits_ready += task.done()
+        self.rank_hits[entry.rank] += 1
+        return task
+
+    def yield_to(self, client: NotionClient, page_id: Optional[str] = None) -> int:
+        """
+        Cancel unfinished prefetches if the limiter has a queue.
+
+        Called before each tool call; the prefetch for ``page_id`` (the page
+        that call is about to read) is kept. Returns the number cancelled.
+        """
+        if not client.queue_depth:
+            return 0
+        keep = _normalize_id(page_id) if page_id else None
+        cancelled = 0
+        for key, entry in list(self._pending.items()):
+            if key != keep and not entry.task.done():
+                del self._pending[key]
+                entry.task.cancel()
+                cancelled += 1
+        self.cancelled += cancelled
+        return cancelled
+
+    def discard(self, page_id: str) -> None:
+        """Forget a prefetch whose page has been written to."""
+        entry = self._pending.pop(_normalize_id(page_id), None)
+        if entry is not None:
+            self._discard_entry(entry)
+
+    def _discard_entry(self, entry: _Prefetch) -> None:
+        if not entry.task.done():
+            entry.task.cancel()
+            self.cancelled += 1
+        elif not entry.task.cancelled() and entry.task.exception() is None:
+            self.wasted += 1
+
+    def clear(self) -> None:
+        """Drop every outstanding prefetch."""
+        for entry in self._pending.values():
+            self._discard_entry(entry)
+        self._pending.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Hit rates for tuning ``top_k``.
+
+        ``hit_rate`` is the share of content reads served by a prefetch,
+        ``precision`` the share of prefetches that were used, and
+        ``rank_hits`` counts hits by search position.
+        """
+        reads = self.hits + self.misses
+        return {
+            "top_k": self.top_k,
+            "scheduled": self.scheduled,
+            "skipped": self.skipped,
+            "in_flight": sum(not e.task.done() for e in self._pending.values()),
+            "hits": self.hits,
+            "hits_ready": self.hits_ready,
+            "misses": self.misses,
+            "cancelled": self.cancelled,
+            "wasted": self.wasted,
+            "failed": self.failed,
+            "hit_rate": round(self.hits / reads, 3) if reads else 0.0,
+            "precision": round(self.hits / self.scheduled, 3) if self.scheduled else 0.0,
+            "rank_hits": list(self.rank_hits),
+        }
+
+
 # -----------------------------------------------------------------------------
 # Notion Agent
 # -----------------------------------------------------------------------------
@@ -609,135 +3169,72 @@ class NotionAgent:
         self,
         api_key: Optional[str] = None,
         knowledge_base_url: Optional[str] = None,
+        cache: Optional[ResponseCache] = None,
+        store: Optional[ContentStore] = None,
+        connection: Optional[ConnectionConfig] = None,
+        knowledge_index: Optional[Any] = None,
+        metrics: Optional[Metrics] = None,
+        query_engine: Optional[Any] = None,
+        write_behind_s: Optional[float] = None,
+        tool_timeout_s: Optional[float] = None,
+        journal: Optional[CreateJournal] = None,
+        prefetcher: Optional[Prefetcher] = None,
+        registry: Optional[ToolRegistry] = None,
     ):
-        self.client = NotionClient(api_key)
-        self.knowledge_base_url = knowledge_base_url or "http://localhost:5053"
+        # NOTION_CACHE_PATH gives CLI/MCP processes a warm on-disk cache.
+        self._owns_store = store is None and bool(os.getenv("NOTION_CACHE_PATH"))
+        if self._owns_store:
+            store = ContentStore(os.environ["NOTION_CACHE_PATH"])
+        # NOTION_JOURNAL_PATH makes idempotent creates safe across runs.
+        self._owns_journal = journal is None and bool(os.getenv("NOTION_JOURNAL_PATH"))
+        if self._owns_journal:
+            journal = CreateJournal(os.environ["NOTION_JOURNAL_PATH"])
+        self.client = NotionClient(
+            api_key,
+            cache=cache,
+            store=store,
+            connection=connection,
+            metrics=metrics,
+            write_behind_s=write_behind_s,
+            journal=journal,
+        )
+        self._kb_client: Optional[httpx.AsyncClient] = None
+        # Remote knowledge base is opt-in; the local index is preferred.
+        self.knowledge_base_url = knowledge_base_url or os.getenv(
+            "NOTION_KNOWLEDGE_BASE_URL"
+        )
+        # NOTION_INDEX_PATH opens a local index kept fresh by
+        # `notion_sync.py --index PATH`.
+        self._owns_index = knowledge_index is None and bool(os.getenv("NOTION_INDEX_PATH"))
+        if self._owns_index:
+            from notion_index import KnowledgeIndex  # imports this module
+
+            knowledge_index = KnowledgeIndex(os.environ["NOTION_INDEX_PATH"])
+        self.knowledge_index = knowledge_index
+        # e.g. notion_query.LocalQueryEngine; answers query_database locally.
+        self.query_engine = query_engine
+        # Default deadline for each execute_tool call (NOTION_TOOL_TIMEOUT_S).
+        if tool_timeout_s is None and os.getenv("NOTION_TOOL_TIMEOUT_S"):
+            tool_timeout_s = float(os.environ["NOTION_TOOL_TIMEOUT_S"])
+        self.tool_timeout_s = tool_timeout_s
+        # Speculative reads after search are opt-in (NOTION_PREFETCH_TOP_K).
+        if prefetcher is None and os.getenv("NOTION_PREFETCH_TOP_K"):
+            prefetcher = Prefetcher(top_k=int(os.environ["NOTION_PREFETCH_TOP_K"]))
+        self.prefetcher = prefetcher
         self.block_builder = BlockBuilder
         self.property_builder = PropertyBuilder
-        self._tools = self._register_tools()
+        # Shared by default so per-tool limits apply across agents.
+        self.registry = registry if registry is not None else TOOLS
 
-    def _register_tools(self) -> Dict[str, Tool]:
-        """Register all available tools."""
-        return {
-            # READ tools
-            "get_page": Tool(
-                name="get_page",
-                description="Retrieve a page by its ID, including properties and metadata",
-                category=ToolCategory.READ,
-                parameters={"page_id": "string - The Notion page ID"},
-                required_params=["page_id"],
-                examples=["Get page abc123"],
-            ),
-            "get_page_content": Tool(
-                name="get_page_content",
-                description="Get the full text content of a page",
-                category=ToolCategory.READ,
-                parameters={"page_id": "string - The Notion page ID"},
-                required_params=["page_id"],
-            ),
-            "get_database": Tool(
-                name="get_database",
-                description="Retrieve a database schema and metadata",
-                category=ToolCategory.READ,
-                parameters={"database_id": "string - The Notion database ID"},
-                required_params=["database_id"],
-            ),
-            # SEARCH tools
-            "search": Tool(
-                name="search",
-                description="Search across the entire workspace for pages and databases",
-                category=ToolCategory.SEARCH,
-                parameters={
-                    "query": "string - Search query",
-                    "filter_type": "string - Optional: 'page' or 'database'",
-                },
-                required_params=[],
-                examples=["Search for 'meeting notes'", "Find all databases"],
-            ),
-            "query_database": Tool(
-                name="query_database",
-                description="Query a database with filters and sorting",
-                category=ToolCategory.SEARCH,
-                parameters={
-                    "database_id": "string - The database ID",
-                    "filter": "object - Optional filter conditions",
-                    "sorts": "array - Optional sort conditions",
-                },
-                required_params=["database_id"],
-            ),
-            # WRITE tools
-            "create_page": Tool(
-                name="create_page",
-                description="Create a new page in a workspace or database",
-                category=ToolCategory.WRITE,
-                parameters={
-                    "parent_id": "string - Parent page or database ID",
-                    "parent_type": "string - 'page_id' or 'database_id'",
-                    "title": "string - Page title",
-                    "content": "string - Optional markdown content to add",
-                },
-                required_params=["parent_id", "parent_type", "title"],
-            ),
-            "update_page": Tool(
-                name="update_page",
-                description="Update a page's properties or archive status",
-                category=ToolCategory.WRITE,
-                parameters={
-                    "page_id": "string - The page ID",
-                    "properties": "object - Properties to update",
-                    "archived": "boolean - Whether to archive the page",
-                },
-                required_params=["page_id"],
-            ),
-            "append_content": Tool(
-                name="append_content",
-                description="Append content blocks to a page",
-                category=ToolCategory.WRITE,
-                parameters={
-                    "page_id": "string - The page ID",
-                    "content": "string - Markdown content to append",
-                },
-                required_params=["page_id", "content"],
-            ),
-            "create_database": Tool(
-                name="create_database",
-                description="Create a new database in a page",
-                category=ToolCategory.WRITE,
-                parameters={
-                    "parent_page_id": "string - Parent page ID",
-                    "title": "string - Database title",
-                    "properties": "object - Database property schema",
-                },
-                required_params=["parent_page_id", "title", "properties"],
-            ),
-            # MANAGE tools
-            "archive_page": Tool(
-                name="archive_page",
-                description="Archive (soft delete) a page",
-                category=ToolCategory.MANAGE,
-                parameters={"page_id": "string - The page ID"},
-                required_params=["page_id"],
-            ),
-            "delete_block": Tool(
-                name="delete_block",
-                description="Delete a specific block",
-                category=ToolCategory.MANAGE,
-                parameters={"block_id": "string - The block ID"},
-                required_params=["block_id"],
-            ),
-            "get_workspace_info": Tool(
-                name="get_workspace_info",
-                description="Get information about the connected workspace and bot",
-                category=ToolCategory.READ,
-                parameters={},
-                required_params=[],
-            ),
-        }
+    @property
+    def metrics(self) -> Metrics:
+        """Request, tool and conversion metrics (shared with the client)."""
+        return self.client.metrics
 
     @property
     def tools(self) -> List[Tool]:
         """Get all available tools."""
-        return list(self._tools.values())
+        return list(self.registry)
 
     def get_tools_description(self) -> str:
         """Get a formatted description of all tools."""
@@ -760,116 +3257,236 @@ class NotionAgent:
     # -------------------------------------------------------------------------
     # Tool Execution
     # -------------------------------------------------------------------------
-    async def execute_tool(self, tool_name: str, **kwargs) -> ToolResult:
-        """Execute a tool by name with given parameters."""
-        start_time = datetime.now()
-
-        if tool_name not in self._tools:
+    async def execute_tool(
+        self, tool_name: str, *, timeout_s: Optional[float] = None, **kwargs
+    ) -> ToolResult:
+        """
+        Execute a tool by name with given parameters.
+
+        ``timeout_s`` (default: the tool's own ``timeout_s``, then
+        ``tool_timeout_s``) is a deadline for the whole call, shared by every
+        request the tool makes, including time spent waiting for a slot.
+        """
+        start = time.perf_counter()
+        tool = self.registry.get(tool_name)
+        if tool is None:
             return ToolResult(
                 success=False,
                 error=f"Unknown tool: {tool_name}",
                 tool_name=tool_name,
             )
-
-        tool = self._tools[tool_name]
+        if timeout_s is None:
+            timeout_s = tool.timeout_s
+        if timeout_s is None:
+            timeout_s = self.tool_timeout_s
 
         # Check required parameters
         missing = [p for p in tool.required_params if p not in kwargs]
         if missing:
+            self.metrics.observe("tool", tool_name, 0.0, error=True)
             return ToolResult(
                 success=False,
                 error=f"Missing required parameters: {missing}",
                 tool_name=tool_name,
             )
 
+        if self.prefetcher is not None:
+            self.prefetcher.yield_to(self.client, kwargs.get("page_id"))
+
         try:
-            result = await self._execute_tool_impl(tool_name, **kwargs)
-            execution_time = (datetime.now() - start_time).total_seconds() * 1000
+            with deadline(timeout_s):
+                result = await _bounded(self._execute_tool_impl(tool_name, **kwargs))
+            elapsed = time.perf_counter() - start
+            self.metrics.observe("tool", tool_name, elapsed)
             return ToolResult(
                 success=True,
                 data=result,
                 tool_name=tool_name,
-                execution_time_ms=execution_time,
+                execution_time_ms=elapsed * 1000,
             )
         except Exception as e:
-            execution_time = (datetime.now() - start_time).total_seconds() * 1000
+            elapsed = time.perf_counter() - start
+            self.metrics.observe("tool", tool_name, elapsed, error=True)
             return ToolResult(
                 success=False,
                 error=str(e),
                 tool_name=tool_name,
-                execution_time_ms=execution_time,
+                execution_time_ms=elapsed * 1000,
             )
 
     async def _execute_tool_impl(self, tool_name: str, **kwargs) -> Any:
-        """Internal tool execution implementation."""
-        # READ operations
-        if tool_name == "get_page":
-            return await self.client.get_page(kwargs["page_id"])
-
-        if tool_name == "get_page_content":
-            return await self.client.get_page_content(kwargs["page_id"])
-
-        if tool_name == "get_database":
-            return await self.client.get_database(kwargs["database_id"])
-
-        if tool_name == "get_workspace_info":
-            return await self.client.get_me()
-
-        # SEARCH operations
-        if tool_name == "search":
-            return await self.client.search(
-                query=kwargs.get("query", ""),
-                filter_type=kwargs.get("filter_type"),
-            )
+        """
+        Run a tool's handler under its registry policy.
+
+        The call holds one of the tool's concurrency slots, transient failures
+        are retried up to ``max_attempts`` times (never past the deadline),
+        and identical concurrent calls of a cacheable tool share one run.
+        """
+        tool = self.registry.get(tool_name)
+        if tool is None or tool.handler is None:
+            raise ValueError(f"Tool not implemented: {tool_name}")
+        if not tool.cacheable:
+            return await self._run_tool(tool, kwargs)
+
+        # Keyed by client too: agents on other workspaces must not share.
+        key = (tool.name, id(self.client), json.dumps(kwargs, sort_keys=True, default=str))
+        task = self.registry.shared(key, lambda: self._run_tool(tool, kwargs))
+        try:
+            return await _bounded(asyncio.shield(task))
+        except DeadlineExceeded:
+            remaining = remaining_time()
+            if not task.done() or remaining is None or remaining <= 0:
+                raise
+        # The shared call ran out of its creator's (shorter) deadline.
+        return await self._run_tool(tool, kwargs)
+
+    async def _run_tool(self, tool: Tool, kwargs: Dict[str, Any]) -> Any:
+        for attempt in range(max(1, tool.max_attempts)):
+            try:
+                async with self.registry.slot(tool):
+                    return await tool.handler(self, **kwargs)
+            except Exception as e:
+                if attempt + 1 >= tool.max_attempts or not _is_transient(e):
+                    raise
+            self.metrics.record_retry("tool", tool.name)
+            await _bounded(asyncio.sleep(self.client.retry_policy.backoff(attempt)))
 
-        if tool_name == "query_database":
-            return await self.client.query_database(
-                database_id=kwargs["database_id"],
+    # -------------------------------------------------------------------------
+    # Tool Handlers (dispatched through TOOLS)
+    # -------------------------------------------------------------------------
+    async def _tool_get_page(self, **kwargs) -> Any:
+        return await self.client.get_page(kwargs["page_id"])
+
+    async def _tool_get_page_content(self, **kwargs) -> Any:
+        if self.prefetcher is not None:
+            prefetched = self.prefetcher.take(kwargs["page_id"])
+            if prefetched is not None:
+                # Shielded: a caller timing out leaves the read running.
+                try:
+                    return await asyncio.shield(prefetched)
+                except Exception:
+                    pass  # fall back to a direct read
+        return await self.client.get_page_content(kwargs["page_id"])
+
+    async def _tool_get_database(self, **kwargs) -> Any:
+        return await self.client.get_database(kwargs["database_id"])
+
+    async def _tool_get_workspace_info(self, **kwargs) -> Any:
+        return await self.client.get_me()
+
+    async def _tool_search(self, **kwargs) -> Any:
+        results = await self.client.search(
+            query=kwargs.get("query", ""),
+            filter_type=kwargs.get("filter_type"),
+        )
+        if self.prefetcher is not None:
+            self.prefetcher.schedule(self.client, results)
+        return results
+
+    async def _tool_query_database(self, **kwargs) -> Any:
+        if self.query_engine is not None:
+            return await self.query_engine.query_database(
+                kwargs["database_id"],
                 filter_obj=kwargs.get("filter"),
                 sorts=kwargs.get("sorts"),
             )
+        return await self.client.query_database(
+            database_id=kwargs["database_id"],
+            filter_obj=kwargs.get("filter"),
+            sorts=kwargs.get("sorts"),
+        )
 
-        # WRITE operations
-        if tool_name == "create_page":
-            page = await self.client.create_page(
-                parent_type=kwargs["parent_type"],
-                parent_id=kwargs["parent_id"],
-                title=kwargs["title"],
-                properties=kwargs.get("properties"),
-            )
-            # If content provided, append it
-            if kwargs.get("content"):
+    async def _tool_create_page(self, **kwargs) -> Any:
+        key = kwargs.get("idempotency_key")
+        page = await self.client.create_page(
+            parent_type=kwargs["parent_type"],
+            parent_id=kwargs["parent_id"],
+            title=kwargs["title"],
+            properties=kwargs.get("properties"),
+            idempotency_key=key,
+        )
+        self._invalidate_local(kwargs["parent_id"])
+        # If content provided, append it (once per idempotency key)
+        entry = self.client.journal.get(key) if key else None
+        if kwargs.get("content") and "content" not in (entry or {}).get("steps", []):
+            with self.metrics.timer("convert", "markdown_to_blocks"):
                 blocks = self._markdown_to_blocks(kwargs["content"])
-                if blocks:
-                    await self.client.append_blocks(page["id"], blocks)
-            return page
-
-        if tool_name == "update_page":
-            return await self.client.update_page(
-                page_id=kwargs["page_id"],
-                properties=kwargs.get("properties"),
-                archived=kwargs.get("archived"),
-            )
+            if blocks:
+                await self.client.append_blocks(page["id"], blocks)
+            if key:
+                self.client.journal.mark(key, "content")
+        return page
+
+    async def _tool_update_page(self, **kwargs) -> Any:
+        page = await self.client.update_page(
+            page_id=kwargs["page_id"],
+            properties=kwargs.get("properties"),
+            archived=kwargs.get("archived"),
+        )
+        self._invalidate_local(kwargs["page_id"])
+        return page
 
-        if tool_name == "append_content":
+    async def _tool_append_content(self, **kwargs) -> Any:
+        with self.metrics.timer("convert", "markdown_to_blocks"):
             blocks = self._markdown_to_blocks(kwargs["content"])
-            return await self.client.append_blocks(kwargs["page_id"], blocks)
+        result = await self.client.append_blocks(kwargs["page_id"], blocks)
+        self._invalidate_local(kwargs["page_id"])
+        return result
 
-        if tool_name == "create_database":
-            return await self.client.create_database(
-                parent_page_id=kwargs["parent_page_id"],
-                title=kwargs["title"],
-                properties=kwargs["properties"],
-            )
+    async def _tool_sync_page_content(self, **kwargs) -> Any:
+        with self.metrics.timer("convert", "markdown_to_blocks"):
+            blocks = self._markdown_to_blocks(kwargs["content"])
+        result = await self.client.sync_blocks(kwargs["page_id"], blocks)
+        self._invalidate_local(kwargs["page_id"])
+        return result
+
+    async def _tool_create_database(self, **kwargs) -> Any:
+        return await self.client.create_database(
+            parent_page_id=kwargs["parent_page_id"],
+            title=kwargs["title"],
+            properties=kwargs["properties"],
+        )
 
-        # MANAGE operations
-        if tool_name == "archive_page":
-            return await self.client.archive_page(kwargs["page_id"])
+    async def _tool_archive_page(self, **kwargs) -> Any:
+        page = await self.client.archive_page(kwargs["page_id"])
+        self._invalidate_local(kwargs["page_id"])
+        return page
 
-        if tool_name == "delete_block":
-            return await self.client.delete_block(kwargs["block_id"])
+    async def _tool_delete_block(self, **kwargs) -> Any:
+        return await self.client.delete_block(kwargs["block_id"])
 
-        raise ValueError(f"Tool not implemented: {tool_name}")
+    def _invalidate_local(self, object_id: str) -> None:
+        """Drop local copies (query rows, prefetches) made stale by a write."""
+        if self.query_engine is not None:
+            self.query_engine.invalidate(object_id)
+        if self.prefetcher is not None:
+            self.prefetcher.discard(object_id)
+
+    def create_pages_bulk(
+        self,
+        pages: Iterable[Dict[str, Any]],
+        concurrency: int = 8,
+        max_attempts: int = 3,
+    ) -> AsyncIterator[ToolResult]:
+        """
+        Run the ``create_page`` tool over many page specs concurrently.
+
+        Specs take the same parameters as the tool (including markdown
+        ``content``). Results stream back as they complete, with ``index``
+        pointing at the originating spec; failed items are retried alone.
+        Creates are journaled as in ``NotionClient.create_pages_bulk``.
+        """
+        tool = self.registry["create_page"]
+
+        async def create(spec: Dict[str, Any]) -> Any:
+            missing = [p for p in tool.required_params if p not in spec]
+            if missing:
+                raise ValueError(f"Missing required parameters: {missing}")
+            return await self._execute_tool_impl("create_page", **spec)
+
+        return self.client._keyed_bulk(
+            pages, create, "create_page", concurrency, max_attempts
+        )
 
     def _markdown_to_blocks(self, markdown: str) -> List[Dict]:
         """Convert simple markdown to Notion blocks."""
@@ -952,6 +3569,17 @@ class NotionAgent:
             content=content,
         )
 
+    async def sync_page_content(self, page_id: str, markdown: str) -> ToolResult:
+        """
+        Keep a page in sync with generated markdown (e.g. a daily report).
+
+        Only the blocks that differ are updated, deleted or inserted, so a
+        small change to the markdown costs a handful of requests.
+        """
+        return await self.execute_tool(
+            "sync_page_content", page_id=page_id, content=markdown
+        )
+
     async def create_project_page(
         self,
         parent_id: str,
@@ -1016,23 +3644,203 @@ class NotionAgent:
     # Knowledge Queries (RAG Integration)
     # -------------------------------------------------------------------------
     async def search_knowledge(self, query: str, top_k: int = 5) -> List[Dict]:
-        """Search the indexed knowledge base."""
+        """
+        Search the indexed knowledge base.
+
+        Uses the local ``knowledge_index`` (e.g. notion_index.KnowledgeIndex,
+        or one opened from NOTION_INDEX_PATH) when one is attached, otherwise
+        the remote service if configured.
+        """
+        if self.knowledge_index is not None:
+            return self.knowledge_index.search(query, top_k)
+        if not self.knowledge_base_url:
+            return []
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.knowledge_base_url}/search",
-                    params={"query": query, "top_k": top_k},
-                    timeout=30.0,
-                )
-                if response.status_code == 200:
-                    return response.json().get("results", [])
+            if self._kb_client is None:
+                self._kb_client = self.client.http_client()
+            response = await self._kb_client.get(
+                f"{self.knowledge_base_url}/search",
+                params={"query": query, "top_k": top_k},
+            )
+            if response.status_code == 200:
+                return response.json().get("results", [])
         except Exception:
             pass
         return []
 
     async def close(self):
         """Close the agent and cleanup resources."""
+        self._kb_client = None
+        if self.prefetcher is not None:
+            self.prefetcher.clear()
         await self.client.close()
+        if self._owns_store:
+            self.client.store.close()
+        if self._owns_journal:
+            self.client.journal.close()
+        if self._owns_index:
+            self.knowledge_index.close()
+
+
+# -----------------------------------------------------------------------------
+# Tool Registry
+# -----------------------------------------------------------------------------
+# Reads are cacheable; expensive tools get their own caps so they can't crowd
+# out cheap ones under mixed load. Nothing is retried here: the client already
+# retries what is safe to retry.
+TOOLS = ToolRegistry(
+    [
+        # READ tools
+        Tool(
+            name="get_page",
+            description="Retrieve a page by its ID, including properties and metadata",
+            category=ToolCategory.READ,
+            parameters={"page_id": "string - The Notion page ID"},
+            required_params=["page_id"],
+            examples=["Get page abc123"],
+            handler=NotionAgent._tool_get_page,
+            cacheable=True,
+        ),
+        Tool(
+            name="get_page_content",
+            description="Get the full text content of a page",
+            category=ToolCategory.READ,
+            parameters={"page_id": "string - The Notion page ID"},
+            required_params=["page_id"],
+            handler=NotionAgent._tool_get_page_content,
+            max_concurrency=4,
+            cacheable=True,
+        ),
+        Tool(
+            name="get_database",
+            description="Retrieve a database schema and metadata",
+            category=ToolCategory.READ,
+            parameters={"database_id": "string - The Notion database ID"},
+            required_params=["database_id"],
+            handler=NotionAgent._tool_get_database,
+            cacheable=True,
+        ),
+        # SEARCH tools
+        Tool(
+            name="search",
+            description="Search across the entire workspace for pages and databases",
+            category=ToolCategory.SEARCH,
+            parameters={
+                "query": "string - Search query",
+                "filter_type": "string - Optional: 'page' or 'database'",
+            },
+            required_params=[],
+            examples=["Search for 'meeting notes'", "Find all databases"],
+            handler=NotionAgent._tool_search,
+            cacheable=True,
+        ),
+        Tool(
+            name="query_database",
+            description="Query a database with filters and sorting",
+            category=ToolCategory.SEARCH,
+            parameters={
+                "database_id": "string - The database ID",
+                "filter": "object - Optional filter conditions",
+                "sorts": "array - Optional sort conditions",
+            },
+            required_params=["database_id"],
+            handler=NotionAgent._tool_query_database,
+            max_concurrency=4,
+            cacheable=True,
+        ),
+        # WRITE tools
+        Tool(
+            name="create_page",
+            description="Create a new page in a workspace or database",
+            category=ToolCategory.WRITE,
+            parameters={
+                "parent_id": "string - Parent page or database ID",
+                "parent_type": "string - 'page_id' or 'database_id'",
+                "title": "string - Page title",
+                "content": "string - Optional markdown content to add",
+                "idempotency_key": "string - Optional key; repeated calls "
+                "with the same key create the page only once",
+            },
+            required_params=["parent_id", "parent_type", "title"],
+            handler=NotionAgent._tool_create_page,
+        ),
+        Tool(
+            name="update_page",
+            description="Update a page's properties or archive status",
+            category=ToolCategory.WRITE,
+            parameters={
+                "page_id": "string - The page ID",
+                "properties": "object - Properties to update",
+                "archived": "boolean - Whether to archive the page",
+            },
+            required_params=["page_id"],
+            handler=NotionAgent._tool_update_page,
+        ),
+        Tool(
+            name="append_content",
+            description="Append content blocks to a page",
+            category=ToolCategory.WRITE,
+            parameters={
+                "page_id": "string - The page ID",
+                "content": "string - Markdown content to append",
+            },
+            required_params=["page_id", "content"],
+            handler=NotionAgent._tool_append_content,
+        ),
+        Tool(
+            name="sync_page_content",
+            description="Make a page's content match markdown, editing only "
+            "the blocks that changed",
+            category=ToolCategory.WRITE,
+            parameters={
+                "page_id": "string - The page ID",
+                "content": "string - Markdown the page should contain",
+            },
+            required_params=["page_id", "content"],
+            handler=NotionAgent._tool_sync_page_content,
+            max_concurrency=2,
+        ),
+        Tool(
+            name="create_database",
+            description="Create a new database in a page",
+            category=ToolCategory.WRITE,
+            parameters={
+                "parent_page_id": "string - Parent page ID",
+                "title": "string - Database title",
+                "properties": "object - Database property schema",
+            },
+            required_params=["parent_page_id", "title", "properties"],
+            handler=NotionAgent._tool_create_database,
+            max_concurrency=1,
+        ),
+        # MANAGE tools
+        Tool(
+            name="archive_page",
+            description="Archive (soft delete) a page",
+            category=ToolCategory.MANAGE,
+            parameters={"page_id": "string - The page ID"},
+            required_params=["page_id"],
+            handler=NotionAgent._tool_archive_page,
+        ),
+        Tool(
+            name="delete_block",
+            description="Delete a specific block",
+            category=ToolCategory.MANAGE,
+            parameters={"block_id": "string - The block ID"},
+            required_params=["block_id"],
+            handler=NotionAgent._tool_delete_block,
+        ),
+        Tool(
+            name="get_workspace_info",
+            description="Get information about the connected workspace and bot",
+            category=ToolCategory.READ,
+            parameters={},
+            required_params=[],
+            handler=NotionAgent._tool_get_workspace_info,
+            cacheable=True,
+        ),
+    ]
+)
 
 
 # -----------------------------------------------------------------------------
@@ -1049,6 +3857,13 @@ async def main():
                         help="Create a page")
     parser.add_argument("--list-tools", action="store_true", help="List all tools")
     parser.add_argument("--info", action="store_true", help="Get workspace info")
+    parser.add_argument("--export", metavar="PATH",
+                        help="Snapshot the workspace to PATH (.jsonl.gz or .jsonl.zst)")
+    parser.add_argument("--import", dest="import_", nargs=2,
+                        metavar=("PATH", "PARENT_ID"),
+                        help="Restore a snapshot under page PARENT_ID")
+    parser.add_argument("--concurrency", type=int, default=8,
+                        help="Concurrent fetches/creates for --export/--import")
     args = parser.parse_args()
 
     agent = NotionAgent()
@@ -1091,6 +3906,26 @@ async def main():
             print(json.dumps(result.data if result.success else {"error": result.error}, indent=2))
             return
 
+        if args.export or args.import_:
+            from notion_snapshot import export_snapshot, progress_printer, restore_snapshot
+
+            if args.export:
+                report = await export_snapshot(
+                    agent.client, args.export, args.concurrency, progress_printer("export")
+                )
+            else:
+                path, parent_id = args.import_
+                report = await restore_snapshot(
+                    agent.client, path, parent_id, args.concurrency,
+                    progress_printer("import"),
+                )
+            print(f"\n{'Exported' if args.export else 'Restored'} {report.summary()}")
+            for kind, count in sorted(report.skipped.items()):
+                print(f"Skipped {count} x {kind}")
+            for error in report.errors:
+                print(f"Error: {error}")
+            return
+
         if args.create_page:
             parent_id, title = args.create_page
             result = await agent.execute_tool(
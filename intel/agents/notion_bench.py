@@ -0,0 +1,367 @@
+"""
+Notion Client Benchmarks
+========================
+Throughput and latency benchmarks for `NotionClient` and
+`NotionAgent.execute_tool`, run against the in-memory `FakeNotion` server
+so results are reproducible and need no API key.
+
+Usage:
+    python notion_bench.py
+    python notion_bench.py --latency-ms 80 --inject-429 0.02 --rate 3
+    python notion_bench.py --save baseline.json
+    python notion_bench.py --compare baseline.json --tolerance 0.2
+
+Each scenario reports operations/sec, requests/sec, p50/p95/p99 latency
+per operation and per HTTP request, and peak traced memory. `--compare`
+exits non-zero when any scenario's throughput regresses past tolerance.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+from notion_agent import BlockBuilder, NotionAgent, NotionClient, RateLimiter, RetryPolicy
+from notion_fake import FakeNotion
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class _TimedTransport(httpx.AsyncBaseTransport):
+    """Records the wall time of every request passing through a transport."""
+
+    def __init__(self, inner: httpx.AsyncBaseTransport):
+        self.inner = inner
+        self.latencies_ms: List[float] = []
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        start = time.perf_counter()
+        response = await self.inner.handle_async_request(request)
+        self.latencies_ms.append((time.perf_counter() - start) * 1000)
+        return response
+
+
+@dataclass
+class BenchResult:
+    """Measurements for one scenario."""
+    name: str
+    operations: int
+    requests: int
+    duration_s: float
+    ops_per_s: float
+    requests_per_s: float
+    op_p50_ms: float
+    op_p95_ms: float
+    op_p99_ms: float
+    request_p50_ms: float
+    request_p95_ms: float
+    request_p99_ms: float
+    peak_memory_kb: float
+    throttled: int
+    retries: int
+
+    def row(self) -> str:
+        return (
+            f"{self.name:<18} {self.operations:>6} ops {self.ops_per_s:>9.1f} ops/s "
+            f"{self.requests_per_s:>8.1f} req/s  op p50/p95/p99 "
+            f"{self.op_p50_ms:.1f}/{self.op_p95_ms:.1f}/{self.op_p99_ms:.1f} ms  "
+            f"req p50/p95/p99 {self.request_p50_ms:.1f}/{self.request_p95_ms:.1f}/"
+            f"{self.request_p99_ms:.1f} ms  peak {self.peak_memory_kb:,.0f} KB"
+        )
+
+
+@dataclass
+class BenchConfig:
+    latency_ms: float = 20.0
+    jitter_ms: float = 10.0
+    inject_429: float = 0.0
+    rate: Optional[float] = None  # client-side req/s; None disables pacing
+    pages: int = 200
+    rows: int = 2000
+    depth: int = 4
+    fanout: int = 4
+    concurrency: int = 16
+
+
+class Scenario:
+    """A benchmark: seed the fake workspace, then time a list of operations."""
+
+    def __init__(self, config: BenchConfig):
+        self.config = config
+        self.fake = FakeNotion(
+            latency_s=config.latency_ms / 1000,
+            jitter_s=config.jitter_ms / 1000,
+            fail_rate_429=config.inject_429,
+            retry_after_s=0.05,
+        )
+        self.transport = _TimedTransport(self.fake.transport())
+        limiter = (
+            RateLimiter(rate=config.rate, burst=max(1, int(config.rate)))
+            if config.rate
+            else RateLimiter(rate=1e9, burst=10**6)
+        )
+        self.client = NotionClient(
+            "fake-key",
+            transport=self.transport,
+            rate_limiter=limiter,
+            retry_policy=RetryPolicy(backoff_base_s=0.01, backoff_max_s=0.2),
+            tree_concurrency=config.concurrency,
+        )
+
+    async def close(self) -> None:
+        await self.client.close()
+
+    async def measure(
+        self,
+        name: str,
+        operations: List[Callable[[], Awaitable[Any]]],
+        concurrency: int = 1,
+    ) -> BenchResult:
+        self.transport.latencies_ms.clear()
+        throttled_before = self.fake.throttled
+        retries_before = self.client.retry_count
+        op_latencies: List[float] = []
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run(op: Callable[[], Awaitable[Any]]) -> None:
+            async with semaphore:
+                start = time.perf_counter()
+                await op()
+                op_latencies.append((time.perf_counter() - start) * 1000)
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        await asyncio.gather(*(run(op) for op in operations))
+        duration = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        requests = self.transport.latencies_ms
+        return BenchResult(
+            name=name,
+            operations=len(operations),
+            requests=len(requests),
+            duration_s=duration,
+            ops_per_s=len(operations) / duration if duration else 0.0,
+            requests_per_s=len(requests) / duration if duration else 0.0,
+            op_p50_ms=_percentile(op_latencies, 50),
+            op_p95_ms=_percentile(op_latencies, 95),
+            op_p99_ms=_percentile(op_latencies, 99),
+            request_p50_ms=_percentile(requests, 50),
+            request_p95_ms=_percentile(requests, 95),
+            request_p99_ms=_percentile(requests, 99),
+            peak_memory_kb=peak / 1024,
+            throttled=self.fake.throttled - throttled_before,
+            retries=self.client.retry_count - retries_before,
+        )
+
+
+def _nested_blocks(depth: int, fanout: int, label: str = "n") -> List[Dict[str, Any]]:
+    if depth == 0:
+        return []
+    blocks = []
+    for i in range(fanout):
+        name = f"{label}.{i}"
+        children = _nested_blocks(depth - 1, fanout, name)
+        blocks.append(BlockBuilder.toggle(f"Section {name}", children or None))
+    return blocks
+
+
+async def bench_bulk_create(config: BenchConfig) -> BenchResult:
+    scenario = Scenario(config)
+    root = scenario.fake.add_page(None, "Bench Root")
+    specs = [
+        {"parent_type": "page_id", "parent_id": root["id"], "title": f"Page {i}"}
+        for i in range(config.pages)
+    ]
+
+    async def create_all() -> None:
+        async for result in scenario.client.create_pages_bulk(
+            specs, concurrency=config.concurrency
+        ):
+            if not result.success:
+                raise RuntimeError(result.error)
+
+    try:
+        result = await scenario.measure("bulk_create", [create_all])
+    finally:
+        await scenario.close()
+    result.operations = config.pages
+    result.ops_per_s = config.pages / result.duration_s
+    return result
+
+
+async def bench_deep_read(config: BenchConfig) -> BenchResult:
+    scenario = Scenario(config)
+    pages = [
+        scenario.fake.add_page(
+            None, f"Deep {i}", _nested_blocks(config.depth, config.fanout)
+        )
+        for i in range(4)
+    ]
+    try:
+        return await scenario.measure(
+            "deep_page_read",
+            [lambda p=p: scenario.client.get_page_content(p["id"]) for p in pages],
+        )
+    finally:
+        await scenario.close()
+
+
+async def bench_database_scan(config: BenchConfig) -> BenchResult:
+    scenario = Scenario(config)
+    root = scenario.fake.add_page(None, "DB Root")
+    database = scenario.fake.add_database(
+        root["id"],
+        "Leads",
+        {"Name": {"title": {}}, "Value": {"number": {}}},
+    )
+    for i in range(config.rows):
+        scenario.fake.add_page(
+            database["id"],
+            f"Lead {i}",
+            properties={
+                "Name": {"title": [{"text": {"content": f"Lead {i}"}}]},
+                "Value": {"number": i},
+            },
+            parent_type="database_id",
+        )
+
+    async def scan() -> None:
+        count = 0
+        async for _ in scenario.client.iter_query_database(database["id"]):
+            count += 1
+        if count != config.rows:
+            raise RuntimeError(f"Scanned {count} rows, expected {config.rows}")
+
+    try:
+        result = await scenario.measure("database_scan", [scan])
+    finally:
+        await scenario.close()
+    result.operations = config.rows
+    result.ops_per_s = config.rows / result.duration_s
+    return result
+
+
+async def bench_execute_tool(config: BenchConfig) -> BenchResult:
+    scenario = Scenario(config)
+    agent = NotionAgent("fake-key")
+    await agent.client.close()  # replaced by the scenario's client
+    agent.client = scenario.client
+    pages = [scenario.fake.add_page(None, f"Tool {i}") for i in range(config.pages)]
+    try:
+        return await scenario.measure(
+            "execute_tool",
+            [
+                lambda p=p: agent.execute_tool("get_page", page_id=p["id"])
+                for p in pages
+            ],
+            concurrency=config.concurrency,
+        )
+    finally:
+        await agent.close()
+
+
+SCENARIOS: Dict[str, Callable[[BenchConfig], Awaitable[BenchResult]]] = {
+    "bulk_create": bench_bulk_create,
+    "deep_page_read": bench_deep_read,
+    "database_scan": bench_database_scan,
+    "execute_tool": bench_execute_tool,
+}
+
+
+async def run_benchmarks(
+    config: BenchConfig, names: Optional[List[str]] = None
+) -> List[BenchResult]:
+    results = []
+    for name in names or list(SCENARIOS):
+        results.append(await SCENARIOS[name](config))
+    return results
+
+
+def compare(
+    results: List[BenchResult], baseline: Dict[str, Dict[str, Any]], tolerance: float
+) -> List[str]:
+    """Describe scenarios whose throughput fell more than ``tolerance`` below baseline."""
+    regressions = []
+    for result in results:
+        base = baseline.get(result.name)
+        if base and result.ops_per_s < base["ops_per_s"] * (1 - tolerance):
+            regressions.append(
+                f"{result.name}: {result.ops_per_s:.1f} ops/s vs "
+                f"baseline {base['ops_per_s']:.1f}"
+            )
+    return regressions
+
+
+async def main():
+    """Run the benchmark suite from the command line."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="NotionClient benchmarks")
+    parser.add_argument("--scenario", "-s", action="append", choices=list(SCENARIOS),
+                        help="Scenario to run (repeatable; default all)")
+    parser.add_argument("--latency-ms", type=float, default=20.0,
+                        help="Fake server latency")
+    parser.add_argument("--jitter-ms", type=float, default=10.0,
+                        help="Extra random latency")
+    parser.add_argument("--inject-429", type=float, default=0.0,
+                        help="Probability of a 429")
+    parser.add_argument("--rate", type=float,
+                        help="Client rate limit in req/s (default off)")
+    parser.add_argument("--pages", type=int, default=200, help="Pages for create/tool runs")
+    parser.add_argument("--rows", type=int, default=2000, help="Rows for the database scan")
+    parser.add_argument("--concurrency", type=int, default=16, help="Client concurrency")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    parser.add_argument("--save", help="Write results to a baseline file")
+    parser.add_argument("--compare", help="Baseline file to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed throughput drop vs baseline (fraction)")
+    args = parser.parse_args()
+
+    config = BenchConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        inject_429=args.inject_429,
+        rate=args.rate,
+        pages=args.pages,
+        rows=args.rows,
+        concurrency=args.concurrency,
+    )
+    results = await run_benchmarks(config, args.scenario)
+
+    if args.json:
+        print(json.dumps([asdict(r) for r in results], indent=2))
+    else:
+        for result in results:
+            print(result.row())
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({r.name: asdict(r) for r in results}, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -52,6 +52,7 @@ Available tools:
 - create_page: Create a new page (parent_id, parent_type, title, content)
 - update_page: Update a page (page_id, properties, archived)
 - append_content: Add content to a page (page_id, content)
+- sync_page_content: Replace a page's content with markdown, editing only what changed (page_id, content)
 - create_database: Create a database (parent_page_id, title, properties)
 - archive_page: Archive a page (page_id)
 - delete_block: Delete a block (block_id)
@@ -0,0 +1,494 @@
+"""
+Fake Notion API
+===============
+In-memory stand-in for the Notion REST API, served through an httpx
+`MockTransport` so `NotionClient` can be exercised without network access.
+
+Implements pages, databases (create, retrieve, update, query), blocks
+(retrieve, update, delete, list and append children with `after`), search
+and users, with cursor pagination, configurable latency and injected 429s.
+
+Usage:
+    fake = FakeNotion(latency_s=0.05, fail_rate_429=0.02)
+    root = fake.add_page(None, "Root")
+    client = NotionClient("fake-key", transport=fake.transport())
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import random
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds").replace(
+        "+00:00", "Z"
+    )
+
+
+def _rich_text(text: str) -> List[Dict[str, Any]]:
+    return [
+        {
+            "type": "text",
+            "text": {"content": text, "link": None},
+            "plain_text": text,
+            "href": None,
+        }
+    ]
+
+
+def _with_plain_text(value: Any) -> Any:
+    """Fill in ``plain_text`` on rich text written by clients, like Notion does."""
+    if isinstance(value, list):
+        return [_with_plain_text(v) for v in value]
+    if isinstance(value, dict):
+        out = {k: _with_plain_text(v) for k, v in value.items()}
+        if "text" in out and isinstance(out["text"], dict) and "plain_text" not in out:
+            out.setdefault("type", "text")
+            out["plain_text"] = out["text"].get("content", "")
+        return out
+    return value
+
+
+class FakeNotion:
+    """
+    In-memory Notion workspace.
+
+    Args:
+        latency_s: Base latency added to every request.
+        jitter_s: Extra uniformly random latency per request.
+        fail_rate_429: Probability of answering a request with a 429.
+        server_rate: If set, requests beyond this many per second get a 429.
+        retry_after_s: Retry-After value sent with injected 429s.
+        seed: Seed for the latency/429 random generator.
+    """
+
+    def __init__(
+        self,
+        latency_s: float = 0.0,
+        jitter_s: float = 0.0,
+        fail_rate_429: float = 0.0,
+        server_rate: Optional[float] = None,
+        retry_after_s: float = 1.0,
+        seed: int = 0,
+    ):
+        self.latency_s = latency_s
+        self.jitter_s = jitter_s
+        self.fail_rate_429 = fail_rate_429
+        self.server_rate = server_rate
+        self.retry_after_s = retry_after_s
+        self._random = random.Random(seed)
+        self._window: List[float] = []
+        self.pages: Dict[str, Dict[str, Any]] = {}
+        self.databases: Dict[str, Dict[str, Any]] = {}
+        self.blocks: Dict[str, Dict[str, Any]] = {}
+        self.children: Dict[str, List[str]] = {}
+        self.users = [
+            {
+                "object": "user",
+                "id": str(uuid.uuid4()),
+                "type": "person",
+                "name": "Fake User",
+            },
+        ]
+        self.bot = {
+            "object": "user",
+            "id": str(uuid.uuid4()),
+            "type": "bot",
+            "name": "Fake Bot",
+        }
+        self.requests: Counter = Counter()
+        self.throttled = 0
+
+    def transport(self) -> httpx.MockTransport:
+        """Transport to pass to ``NotionClient(transport=...)``."""
+        return httpx.MockTransport(self.handle)
+
+    # -------------------------------------------------------------------------
+    # Seeding
+    # -------------------------------------------------------------------------
+    def add_page(
+        self,
+        parent_id: Optional[str],
+        title: str,
+        blocks: Optional[List[Dict[str, Any]]] = None,
+        properties: Optional[Dict[str, Any]] = None,
+        parent_type: str = "page_id",
+    ) -> Dict[str, Any]:
+        """Create a page directly in the store (no request counted)."""
+        parent = (
+            {"type": "workspace", "workspace": True}
+            if parent_id is None
+            else {"type": parent_type, parent_type: parent_id}
+        )
+        if properties is None:
+            properties = {"title": {"title": [{"text": {"content": title}}]}}
+        page = self._make_page(parent, properties)
+        if blocks:
+            self._append(page["id"], blocks, None)
+        return page
+
+    def add_database(
+        self,
+        parent_page_id: str,
+        title: str,
+        properties: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        return self._make_database(
+            {"type": "page_id", "page_id": parent_page_id}, title, properties
+        )
+
+    # -------------------------------------------------------------------------
+    # Request handling
+    # -------------------------------------------------------------------------
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        delay = self.latency_s
+        if self.jitter_s:
+            delay += self._random.uniform(0, self.jitter_s)
+        if delay:
+            await asyncio.sleep(delay)
+        parts = request.url.path.split("/")[2:]  # strip "", "v1"
+        route = self._route_name(request.method, parts)
+        self.requests[route] += 1
+        if self._should_throttle():
+            self.throttled += 1
+            return httpx.Response(
+                429,
+                headers={"Retry-After": str(self.retry_after_s)},
+                json={"object": "error", "status": 429, "code": "rate_limited"},
+            )
+        body = json.loads(request.content) if request.content else {}
+        try:
+            status, payload = self._dispatch(
+                request.method, parts, request.url.params, body
+            )
+        except KeyError as e:
+            status = 404
+            payload = {"code": "object_not_found", "message": f"Not found: {e}"}
+        except ValueError as e:
+            status, payload = 400, {"code": "validation_error", "message": str(e)}
+        if status >= 400:
+            payload = {"object": "error", "status": status, **payload}
+        return httpx.Response(status, json=payload)
+
+    def _should_throttle(self) -> bool:
+        if self.fail_rate_429 and self._random.random() < self.fail_rate_429:
+            return True
+        if self.server_rate:
+            now = time.monotonic()
+            self._window = [t for t in self._window if now - t < 1.0]
+            if len(self._window) >= self.server_rate:
+                return True
+            self._window.append(now)
+        return False
+
+    @staticmethod
+    def _route_name(method: str, parts: List[str]) -> str:
+        shape = [p if i % 2 == 0 else "{id}" for i, p in enumerate(parts)]
+        return f"{method} /{'/'.join(shape)}"
+
+    def _dispatch(
+        self, method: str, parts: List[str], params: Any, body: Dict[str, Any]
+    ) -> Tuple[int, Dict[str, Any]]:
+        resource = parts[0]
+        object_id = parts[1] if len(parts) > 1 else None
+        sub = parts[2] if len(parts) > 2 else None
+
+        if resource == "pages":
+            if method == "POST":
+                return 200, self._create_page(body)
+            page = self.pages[object_id]
+            if method == "PATCH":
+                self._update_page(page, body)
+            return 200, page
+
+        if resource == "databases":
+            if method == "POST" and object_id is None:
+                return 200, self._make_database(
+                    body["parent"], _title_of(body.get("title")), body.get("properties", {})
+                )
+            database = self.databases[object_id]
+            if sub == "query":
+                rows = [
+                    p for p in self.pages.values()
+                    if p["parent"].get("database_id") == object_id and not p["archived"]
+                ]
+                return 200, self._paginate(
+                    rows, body.get("start_cursor"), body.get("page_size")
+                )
+            if method == "PATCH":
+                if "title" in body:
+                    database["title"] = _with_plain_text(body["title"])
+                database["properties"].update(_schema(body.get("properties", {})))
+                database["last_edited_time"] = _now()
+            return 200, database
+
+        if resource == "blocks":
+            if sub == "children":
+                if object_id not in self.blocks and object_id not in self.pages:
+                    raise KeyError(object_id)
+                if method == "PATCH":
+                    created = self._append(object_id, body["children"], body.get("after"))
+                    return 200, {"object": "list", "results": created, "has_more": False}
+                blocks = [
+                    self.blocks.get(i)
+                    or (
+                        self._page_as_block(self.pages[i])
+                        if i in self.pages
+                        else self._database_as_block(self.databases[i])
+                    )
+                    for i in self.children.get(object_id, [])
+                ]
+                return 200, self._paginate(
+                    blocks, params.get("start_cursor"), params.get("page_size")
+                )
+            if object_id in self.pages and object_id not in self.blocks:
+                return 200, self._page_as_block(self.pages[object_id])
+            block = self.blocks[object_id]
+            if method == "DELETE":
+                block["archived"] = True
+                self.children[block["parent"][block["parent"]["type"]]].remove(object_id)
+            elif method == "PATCH":
+                block_type = block["type"]
+                block[block_type].update(_with_plain_text(body.get(block_type, {})))
+                block["last_edited_time"] = _now()
+                self._touch_ancestors(block)
+            return 200, block
+
+        if resource == "search":
+            return 200, self._search(body)
+
+        if resource == "users":
+            if object_id == "me":
+                return 200, self.bot
+            return 200, self._paginate(
+                self.users, params.get("start_cursor"), params.get("page_size")
+            )
+
+        raise ValueError(f"Unsupported endpoint: {method} /{'/'.join(parts)}")
+
+    # -------------------------------------------------------------------------
+    # Store operations
+    # -------------------------------------------------------------------------
+    def _make_page(
+        self, parent: Dict[str, Any], properties: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        now = _now()
+        page_id = str(uuid.uuid4())
+        props = {}
+        for name, value in _with_plain_text(properties).items():
+            prop_type = next((k for k in value if k not in ("id", "type")), "rich_text")
+            props[name] = {"id": name[:4], "type": prop_type, **value}
+        page = {
+            "object": "page",
+            "id": page_id,
+            "created_time": now,
+            "last_edited_time": now,
+            "archived": False,
+            "parent": parent,
+            "properties": props,
+            "url": f"https://www.notion.so/{page_id.replace('-', '')}",
+        }
+        self.pages[page_id] = page
+        self.children[page_id] = []
+        if parent.get("type") == "page_id":
+            # Child pages are listed among their parent's blocks.
+            self.children.setdefault(parent["page_id"], []).append(page_id)
+        return page
+
+    def _create_page(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        parent = dict(body["parent"])
+        parent_type = next(iter(parent))
+        parent_id = parent[parent_type]
+        if parent_type == "database_id" and parent_id not in self.databases:
+            raise KeyError(parent_id)
+        if parent_type == "page_id" and parent_id not in self.pages:
+            raise KeyError(parent_id)
+        page = self._make_page({"type": parent_type, **parent}, body.get("properties", {}))
+        for key in ("icon", "cover"):
+            if key in body:
+                page[key] = body[key]
+        if body.get("children"):
+            self._append(page["id"], body["children"], None)
+        return page
+
+    def _update_page(self, page: Dict[str, Any], body: Dict[str, Any]) -> None:
+        for name, value in _with_plain_text(body.get("properties", {})).items():
+            prop_type = next((k for k in value if k not in ("id", "type")), "rich_text")
+            page["properties"][name] = {"id": name[:4], "type": prop_type, **value}
+        for key in ("archived", "icon", "cover"):
+            if key in body:
+                page[key] = body[key]
+        page["last_edited_time"] = _now()
+
+    def _make_database(
+        self, parent: Dict[str, Any], title: str, properties: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        now = _now()
+        database_id = str(uuid.uuid4())
+        database = {
+            "object": "database",
+            "id": database_id,
+            "created_time": now,
+            "last_edited_time": now,
+            "archived": False,
+            "title": _rich_text(title),
+            "parent": parent,
+            "properties": _schema(properties),
+            "url": f"https://www.notion.so/{database_id.replace('-', '')}",
+        }
+        self.databases[database_id] = database
+        if parent.get("type") == "page_id":
+            # Like child pages, databases are listed among their parent's blocks.
+            self.children.setdefault(parent["page_id"], []).append(database_id)
+        return database
+
+    def _append(
+        self, parent_id: str, children: List[Dict[str, Any]], after: Optional[str]
+    ) -> List[Dict[str, Any]]:
+        if len(children) > 100:
+            raise ValueError("body.children.length should be ≤ 100")
+        siblings = self.children.setdefault(parent_id, [])
+        position = siblings.index(after) + 1 if after else len(siblings)
+        parent_type = "page_id" if parent_id in self.pages else "block_id"
+        created = []
+        for child in children:
+            block_type = child["type"]
+            data = _with_plain_text(dict(child.get(block_type, {})))
+            nested = data.pop("children", None)
+            now = _now()
+            block = {
+                "object": "block",
+                "id": str(uuid.uuid4()),
+                "parent": {"type": parent_type, parent_type: parent_id},
+                "created_time": now,
+                "last_edited_time": now,
+                "has_children": False,
+                "archived": False,
+                "type": block_type,
+                block_type: data,
+            }
+            self.blocks[block["id"]] = block
+            self.children[block["id"]] = []
+            if nested:
+                self._append(block["id"], nested, None)
+            created.append(block)
+        siblings[position:position] = [b["id"] for b in created]
+        if parent_id in self.blocks:
+            self.blocks[parent_id]["has_children"] = True
+        self._touch(parent_id)
+        return created
+
+    def _touch(self, object_id: str) -> None:
+        now = _now()
+        if object_id in self.pages:
+            self.pages[object_id]["last_edited_time"] = now
+        elif object_id in self.blocks:
+            self.blocks[object_id]["last_edited_time"] = now
+            self._touch_ancestors(self.blocks[object_id])
+
+    def _touch_ancestors(self, block: Dict[str, Any]) -> None:
+        parent = block["parent"]
+        self._touch(parent[parent["type"]])
+
+    def _page_as_block(self, page: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "object": "block",
+            "id": page["id"],
+            "type": "child_page",
+            "created_time": page["created_time"],
+            "last_edited_time": page["last_edited_time"],
+            "has_children": bool(self.children.get(page["id"])),
+            "archived": page["archived"],
+            "child_page": {"title": _page_title(page)},
+        }
+
+    def _database_as_block(self, database: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "object": "block",
+            "id": database["id"],
+            "type": "child_database",
+            "created_time": database["created_time"],
+            "last_edited_time": database["last_edited_time"],
+            "has_children": False,
+            "archived": database["archived"],
+            "child_database": {
+                "title": "".join(t["plain_text"] for t in database["title"])
+            },
+        }
+
+    def _search(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        query = (body.get("query") or "").lower()
+        wanted = (body.get("filter") or {}).get("value")
+        objects: List[Dict[str, Any]] = []
+        if wanted in (None, "page"):
+            objects.extend(p for p in self.pages.values() if not p["archived"])
+        if wanted in (None, "database"):
+            objects.extend(self.databases.values())
+        if query:
+            objects = [o for o in objects if query in _object_title(o).lower()]
+        sort = body.get("sort") or {}
+        objects.sort(
+            key=lambda o: o.get(sort.get("timestamp", "last_edited_time"), ""),
+            reverse=sort.get("direction", "descending") == "descending",
+        )
+        return self._paginate(objects, body.get("start_cursor"), body.get("page_size"))
+
+    @staticmethod
+    def _paginate(
+        items: List[Dict[str, Any]], cursor: Optional[str], page_size: Any
+    ) -> Dict[str, Any]:
+        start = int(cursor or 0)
+        size = min(int(page_size or 100), 100)
+        end = start + size
+        return {
+            "object": "list",
+            "results": items[start:end],
+            "has_more": end < len(items),
+            "next_cursor": str(end) if end < len(items) else None,
+        }
+
+
+def _title_of(rich_text: Optional[List[Dict[str, Any]]]) -> str:
+    return "".join(
+        t.get("plain_text") or t.get("text", {}).get("content", "") for t in rich_text or []
+    )
+
+
+def _page_title(page: Dict[str, Any]) -> str:
+    for prop in page.get("properties", {}).values():
+        if prop.get("type") == "title":
+            return _title_of(prop.get("title"))
+    return ""
+
+
+def _object_title(obj: Dict[str, Any]) -> str:
+    if obj["object"] == "page":
+        return _page_title(obj)
+    return _title_of(obj["title"])
+
+
+def _schema(properties: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalize a database property schema the way the API echoes it back."""
+    schema = {}
+    for name, config in properties.items():
+        prop_type = config.get("type") or next(k for k in config if k not in ("id", "name"))
+        options = config.get(prop_type) or {}
+        if "options" in options:
+            options = {
+                **options,
+                "options": [
+                    {"id": str(uuid.uuid4())[:8], "color": "default", **option}
+                    for option in options["options"]
+                ],
+            }
+        schema[name] = {"id": name[:4], "name": name, "type": prop_type, prop_type: options}
+    return schema
@@ -0,0 +1,236 @@
+"""
+Notion Knowledge Index
+======================
+Embedded full-text index (SQLite FTS5, BM25 ranking) over workspace
+content, used by `NotionAgent.search_knowledge` for local lookups instead
+of a remote knowledge-base service.
+
+The index is fed from the text `NotionClient` extracts from block trees,
+either page by page or incrementally from a `WorkspaceMirror`:
+
+    index = KnowledgeIndex("~/.notion/index.db")
+    index.sync_from(mirror)              # only re-indexes changed pages
+    agent = NotionAgent(knowledge_index=index)
+    await agent.search_knowledge("quarterly goals")
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import sqlite3
+from typing import Any, Dict, Iterator, List, Optional
+
+from notion_sync import object_title
+
+CHUNK_CHARS = 800
+
+
+def _chunks(text: str, size: int = CHUNK_CHARS) -> Iterator[str]:
+    """Split text into roughly ``size``-character chunks on line boundaries."""
+    current: List[str] = []
+    length = 0
+    for line in text.splitlines():
+        if current and length + len(line) > size:
+            yield "\n".join(current)
+            current, length = [], 0
+        current.append(line)
+        length += len(line) + 1
+    if current:
+        yield "\n".join(current)
+
+
+def _match_expression(query: str) -> Optional[str]:
+    """Turn free text into an FTS5 query that can't trip its syntax."""
+    terms = re.findall(r"\w+", query.lower())
+    if not terms:
+        return None
+    return " OR ".join(f'"{term}"' for term in dict.fromkeys(terms))
+
+
+class KnowledgeIndex:
+    """
+    Full-text index of page text split into passages.
+
+    Each page is stored as a set of chunks so matches rank on the relevant
+    passage rather than the whole page; results are collapsed to the best
+    chunk per page. Titles are weighted above body text. ``chunk_pages``
+    maps each page to its chunk rowids, since the FTS table can't look up
+    its UNINDEXED ``page_id`` column without scanning every chunk.
+    """
+
+    _SCHEMA = (
+        """CREATE TABLE IF NOT EXISTS docs (
+            page_id TEXT PRIMARY KEY,
+            title TEXT,
+            url TEXT,
+            last_edited_time TEXT
+        )""",
+        """CREATE VIRTUAL TABLE IF NOT EXISTS chunks USING fts5(
+            title, body, page_id UNINDEXED, tokenize = 'porter unicode61'
+        )""",
+        """CREATE TABLE IF NOT EXISTS chunk_pages (
+            chunk_id INTEGER PRIMARY KEY,
+            page_id TEXT NOT NULL
+        )""",
+        "CREATE INDEX IF NOT EXISTS chunk_pages_page ON chunk_pages (page_id)",
+    )
+
+    def __init__(self, path: str = ":memory:"):
+        self.path = path if path == ":memory:" else os.path.expanduser(path)
+        directory = os.path.dirname(self.path) if path != ":memory:" else ""
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        try:
+            with self._conn:
+                mapped = self._has_table("chunk_pages")
+                for statement in self._SCHEMA:
+                    self._conn.execute(statement)
+                if not mapped:
+                    # Index built before chunk_pages existed: map it once.
+                    self._conn.execute(
+                        "INSERT INTO chunk_pages SELECT rowid, page_id FROM chunks"
+                    )
+        except sqlite3.OperationalError as e:
+            raise RuntimeError(f"SQLite build lacks FTS5 support: {e}") from e
+
+    def _has_table(self, name: str) -> bool:
+        row = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+        ).fetchone()
+        return row is not None
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    # -------------------------------------------------------------------------
+    # Updates
+    # -------------------------------------------------------------------------
+    def update(
+        self,
+        page_id: str,
+        title: str,
+        text: str,
+        url: Optional[str] = None,
+        last_edited_time: Optional[str] = None,
+    ) -> None:
+        """Index (or re-index) a page's text, replacing any previous version."""
+        with self._conn:
+            self._delete_chunks(page_id)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO docs VALUES (?, ?, ?, ?)",
+                (page_id, title, url, last_edited_time),
+            )
+            bodies = list(_chunks(text)) or [""]
+            for body in bodies:
+                cursor = self._conn.execute(
+                    "INSERT INTO chunks (title, body, page_id) VALUES (?, ?, ?)",
+                    (title, body, page_id),
+                )
+                self._conn.execute(
+                    "INSERT INTO chunk_pages VALUES (?, ?)", (cursor.lastrowid, page_id)
+                )
+
+    def remove(self, page_id: str) -> None:
+        with self._conn:
+            self._delete_chunks(page_id)
+            self._conn.execute("DELETE FROM docs WHERE page_id = ?", (page_id,))
+
+    def _delete_chunks(self, page_id: str) -> None:
+        """Delete a page's chunks by rowid; caller holds the transaction."""
+        rowids = self._conn.execute(
+            "SELECT chunk_id FROM chunk_pages WHERE page_id = ?", (page_id,)
+        ).fetchall()
+        self._conn.executemany("DELETE FROM chunks WHERE rowid = ?", rowids)
+        self._conn.execute("DELETE FROM chunk_pages WHERE page_id = ?", (page_id,))
+
+    def versions(self) -> Dict[str, Optional[str]]:
+        """page_id -> last_edited_time of every indexed page."""
+        return dict(self._conn.execute("SELECT page_id, last_edited_time FROM docs"))
+
+    def sync_from(self, mirror: Any) -> Dict[str, int]:
+        """
+        Bring the index in line with a WorkspaceMirror.
+
+        Only pages whose ``last_edited_time`` differs from the indexed copy
+        are re-indexed; pages gone from the mirror are dropped.
+        """
+        indexed = self.versions()
+        current = mirror.content_versions()
+        updated = 0
+        for page_id, edited in current.items():
+            if page_id in indexed and indexed[page_id] == edited:
+                continue
+            page = mirror.get(page_id) or {}
+            self.update(
+                page_id,
+                object_title(page),
+                mirror.page_text(page_id) or "",
+                url=page.get("url"),
+                last_edited_time=edited,
+            )
+            updated += 1
+        removed = 0
+        for page_id in indexed.keys() - current.keys():
+            self.remove(page_id)
+            removed += 1
+        return {"updated": updated, "removed": removed}
+
+    async def index_page(self, client: Any, page_id: str) -> None:
+        """Fetch one page through a NotionClient and (re)index it."""
+        page = await client.get_page(page_id)
+        text = await client.get_page_content(page_id)
+        self.update(
+            page_id,
+            object_title(page),
+            text,
+            url=page.get("url"),
+            last_edited_time=page.get("last_edited_time"),
+        )
+
+    # -------------------------------------------------------------------------
+    # Queries
+    # -------------------------------------------------------------------------
+    def search(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
+        """
+        Best-matching pages for ``query``, ranked by BM25.
+
+        Chunks are collapsed per page in SQL (the bare columns of a MIN()
+        aggregate come from the best chunk), so a page with many matching
+        chunks can't crowd others out of the ``top_k`` results.
+        """
+        expression = _match_expression(query)
+        if expression is None or top_k <= 0:
+            return []
+        rows = self._conn.execute(
+            """WITH hits AS MATERIALIZED (
+                   SELECT page_id,
+                          snippet(chunks, 1, '', '', '...', 24) AS snippet,
+                          bm25(chunks, 2.0, 1.0) AS rank
+                   FROM chunks
+                   WHERE chunks MATCH ?
+               )
+               SELECT hits.page_id, docs.title, docs.url, hits.snippet,
+                      MIN(hits.rank) AS best
+               FROM hits JOIN docs ON docs.page_id = hits.page_id
+               GROUP BY hits.page_id
+               ORDER BY best
+               LIMIT ?""",
+            (expression, top_k),
+        ).fetchall()
+        return [
+            {
+                "page_id": page_id,
+                "title": title,
+                "url": url,
+                "snippet": snippet,
+                "score": -rank,
+            }
+            for page_id, title, url, snippet, rank in rows
+        ]
+
+    def close(self) -> None:
+        self._conn.close()
@@ -221,19 +221,19 @@ class NotionMCPServer:
     async def _execute_tool(self, tool_name: str, args: Dict[str, Any]) -> Any:
         """Execute a Notion tool and return the result."""
         if tool_name == "notion_search":
-            result = await self.agent.execute_tool("search", args)
+            result = await self.agent.execute_tool("search", **args)
         elif tool_name == "notion_get_page":
-            result = await self.agent.execute_tool("get_page_content", args)
+            result = await self.agent.execute_tool("get_page_content", **args)
         elif tool_name == "notion_get_database":
-            result = await self.agent.execute_tool("get_database", args)
+            result = await self.agent.execute_tool("get_database", **args)
         elif tool_name == "notion_query_database":
-            result = await self.agent.execute_tool("query_database", args)
+            result = await self.agent.execute_tool("query_database", **args)
         elif tool_name == "notion_create_page":
-            result = await self.agent.execute_tool("create_page", args)
+            result = await self.agent.execute_tool("create_page", **args)
         elif tool_name == "notion_update_page":
-            result = await self.agent.execute_tool("update_page", args)
+            result = await self.agent.execute_tool("update_page", **args)
         elif tool_name == "notion_append_content":
-            result = await self.agent.execute_tool("append_content", args)
+            result = await self.agent.execute_tool("append_content", **args)
         else:
             raise ValueError(f"Unknown tool: {tool_name}")
 
@@ -0,0 +1,552 @@
+"""
+Notion Local Query Engine
+=========================
+Evaluates Notion database `filter` and `sorts` objects against a locally
+held copy of a database, returning results in the same shape as
+`POST /databases/{id}/query`.
+
+Rows come from a `WorkspaceMirror` when one is attached (no API calls),
+otherwise they are pulled once through `NotionClient` and kept in memory
+for ``ttl_s`` seconds, so dashboards polling the same database are served
+locally:
+
+    engine = LocalQueryEngine(client, mirror=mirror, ttl_s=30)
+    agent = NotionAgent(query_engine=engine)
+    await agent.execute_tool("query_database", database_id=db, filter={...})
+
+Supported filters: compound ``and``/``or``; text, number, checkbox,
+select, status, multi_select, date (including relative ``past_week`` etc.),
+people, relation, files, formula, rollup, unique_id and timestamp
+conditions. Dates are compared in UTC.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import bisect
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from notion_agent import NotionClient
+
+Predicate = Callable[[int], bool]
+
+_TEXT_FILTERS = frozenset({"title", "rich_text", "url", "email", "phone_number", "string"})
+_NUMBER_FILTERS = frozenset({"number", "unique_id"})
+_LIST_FILTERS = frozenset(
+    {"multi_select", "people", "relation", "created_by", "last_edited_by"}
+)
+_DATE_FILTERS = frozenset({"date", "created_time", "last_edited_time"})
+_RELATIVE_DAYS = {
+    "past_week": -7,
+    "past_month": -30,
+    "past_year": -365,
+    "next_week": 7,
+    "next_month": 30,
+    "next_year": 365,
+}
+
+
+# -----------------------------------------------------------------------------
+# Value extraction
+# -----------------------------------------------------------------------------
+def property_value(prop: Optional[Dict[str, Any]]) -> Any:
+    """
+    Normalize a property (or formula/rollup result) to a plain Python value.
+
+    Text becomes ``str``, selects their option name, multi-valued properties
+    a list of names or IDs, dates their start string, and rollup arrays a
+    list of item values. Empty scalars become ``None``.
+    """
+    if not prop:
+        return None
+    kind = prop.get("type")
+    value = prop.get(kind)
+    if kind in ("title", "rich_text"):
+        return "".join(t.get("plain_text", "") for t in value or [])
+    if kind in ("select", "status"):
+        return value.get("name") if value else None
+    if kind == "multi_select":
+        return [option.get("name") for option in value or []]
+    if kind in ("people", "relation"):
+        return [item.get("id") for item in value or []]
+    if kind in ("created_by", "last_edited_by"):
+        return [value.get("id")] if value else []
+    if kind == "date":
+        return value.get("start") if value else None
+    if kind in ("formula", "rollup"):
+        return property_value(value)
+    if kind == "array":
+        return [property_value(item) for item in value or []]
+    if kind == "unique_id":
+        return value.get("number") if value else None
+    if kind == "checkbox":
+        return bool(value)
+    return value
+
+
+def _row_value(row: Dict[str, Any], name: Optional[str], timestamp: Optional[str]) -> Any:
+    if timestamp:
+        return row.get(timestamp)
+    return property_value(row.get("properties", {}).get(name))
+
+
+def _parse_time(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def _id_key(object_id: str) -> str:
+    return object_id.replace("-", "").lower()
+
+
+def _is_empty(value: Any) -> bool:
+    return value is None or value == "" or value == []
+
+
+# -----------------------------------------------------------------------------
+# Conditions
+# -----------------------------------------------------------------------------
+def _empty_test(op: str) -> Optional[Callable[[Any], bool]]:
+    if op == "is_empty":
+        return _is_empty
+    if op == "is_not_empty":
+        return lambda v: not _is_empty(v)
+    return None
+
+
+def _text_test(op: str, target: Any) -> Callable[[Any], bool]:
+    text = str(target).casefold() if target is not None else ""
+    tests: Dict[str, Callable[[str], bool]] = {
+        "equals": lambda v: v == target,
+        "does_not_equal": lambda v: v != target,
+        "contains": lambda v: text in v.casefold(),
+        "does_not_contain": lambda v: text not in v.casefold(),
+        "starts_with": lambda v: v.casefold().startswith(text),
+        "ends_with": lambda v: v.casefold().endswith(text),
+    }
+    test = tests[op]
+    return lambda v: test(v or "")
+
+
+def _number_test(op: str, target: Any) -> Callable[[Any], bool]:
+    tests: Dict[str, Callable[[Any], bool]] = {
+        "equals": lambda v: v == target,
+        "does_not_equal": lambda v: v != target,
+        "greater_than": lambda v: v > target,
+        "less_than": lambda v: v < target,
+        "greater_than_or_equal_to": lambda v: v >= target,
+        "less_than_or_equal_to": lambda v: v <= target,
+    }
+    test = tests[op]
+    if op == "does_not_equal":
+        return test
+    return lambda v: v is not None and test(v)
+
+
+def _list_test(op: str, target: Any) -> Callable[[Any], bool]:
+    if op == "contains":
+        return lambda v: target in (v or [])
+    if op == "does_not_contain":
+        return lambda v: target not in (v or [])
+    raise KeyError(op)
+
+
+def _date_test(op: str, target: Any) -> Callable[[Any], bool]:
+    now = datetime.now(timezone.utc)
+    if op in _RELATIVE_DAYS:
+        days = _RELATIVE_DAYS[op]
+        low, high = sorted((now, now + timedelta(days=days)))
+        return lambda v: (t := _parse_time(v)) is not None and low <= t <= high
+    if op == "this_week":
+        week = now.isocalendar()[:2]
+        return lambda v: (t := _parse_time(v)) is not None and t.isocalendar()[:2] == week
+
+    date_only = isinstance(target, str) and len(target) == 10
+    bound: Any = date.fromisoformat(target) if date_only else _parse_time(target)
+
+    def key(v: Any) -> Any:
+        t = _parse_time(v)
+        if t is None:
+            return None
+        return t.date() if date_only else t
+
+    compare: Dict[str, Callable[[Any], bool]] = {
+        "equals": lambda k: k == bound,
+        "before": lambda k: k < bound,
+        "after": lambda k: k > bound,
+        "on_or_before": lambda k: k <= bound,
+        "on_or_after": lambda k: k >= bound,
+    }
+    test = compare[op]
+    return lambda v: (k := key(v)) is not None and test(k)
+
+
+def _value_test(family: str, condition: Dict[str, Any]) -> Callable[[Any], bool]:
+    """Build a test for one ``{"<op>": target}`` condition of a filter type."""
+    if len(condition) != 1:
+        raise ValueError(f"Expected exactly one condition for {family}: {condition}")
+    op, target = next(iter(condition.items()))
+    empty = _empty_test(op)
+    if empty is not None:
+        return empty
+    try:
+        if family in _TEXT_FILTERS:
+            return _text_test(op, target)
+        if family in _NUMBER_FILTERS:
+            return _number_test(op, target)
+        if family in ("checkbox", "boolean"):
+            if op == "equals":
+                return lambda v: bool(v) == target
+            if op == "does_not_equal":
+                return lambda v: bool(v) != target
+        if family in ("select", "status"):
+            if op == "equals":
+                return lambda v: v == target
+            if op == "does_not_equal":
+                return lambda v: v != target
+        if family in _LIST_FILTERS:
+            return _list_test(op, target)
+        if family in _DATE_FILTERS:
+            return _date_test(op, target)
+    except KeyError:
+        pass
+    raise ValueError(f"Unsupported {family} filter condition: {op}")
+
+
+def _formula_test(condition: Dict[str, Any]) -> Callable[[Any], bool]:
+    (family, inner), = condition.items()
+    return _value_test(family, inner)
+
+
+def _rollup_test(condition: Dict[str, Any]) -> Callable[[Any], bool]:
+    (mode, inner), = condition.items()
+    if mode in ("any", "every", "none"):
+        (family, cond), = inner.items()
+        test = _value_test(family, cond)
+        if mode == "any":
+            return lambda v: any(test(item) for item in v or [])
+        if mode == "every":
+            return lambda v: all(test(item) for item in v or [])
+        return lambda v: not any(test(item) for item in v or [])
+    return _value_test(mode, inner)
+
+
+def _leaf_condition(filter_obj: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+    keys = [k for k in filter_obj if k not in ("property", "timestamp", "type")]
+    if len(keys) != 1:
+        raise ValueError(f"Malformed filter: {filter_obj}")
+    return keys[0], filter_obj[keys[0]]
+
+
+# -----------------------------------------------------------------------------
+# Local database
+# -----------------------------------------------------------------------------
+class LocalDatabase:
+    """
+    In-memory copy of one database's rows with lazily built indexes.
+
+    Column values are extracted once per property. Equality conditions on
+    select/status/checkbox use a hash index and number/date range conditions
+    use a sorted index to narrow candidates before predicates run.
+    """
+
+    def __init__(self, database: Dict[str, Any], rows: Sequence[Dict[str, Any]]):
+        self.database = database
+        self.id = database.get("id", "")
+        self.schema: Dict[str, Dict[str, Any]] = database.get("properties", {})
+        self.rows = list(rows)
+        self.loaded_at = time.monotonic()
+        self.row_ids = {_id_key(row["id"]) for row in self.rows}
+        self._columns: Dict[Tuple[Optional[str], Optional[str]], List[Any]] = {}
+        self._hash_indexes: Dict[Tuple, Dict[Any, List[int]]] = {}
+        self._sorted_indexes: Dict[Tuple, Tuple[List[Any], List[int]]] = {}
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def column(self, name: Optional[str], timestamp: Optional[str] = None) -> List[Any]:
+        key = (name, timestamp)
+        values = self._columns.get(key)
+        if values is None:
+            if name is not None and name not in self.schema:
+                raise ValueError(f"Unknown property: {name}")
+            values = [_row_value(row, name, timestamp) for row in self.rows]
+            self._columns[key] = values
+        return values
+
+    # -------------------------------------------------------------------------
+    # Indexes
+    # -------------------------------------------------------------------------
+    def _hash_index(self, key: Tuple) -> Dict[Any, List[int]]:
+        index = self._hash_indexes.get(key)
+        if index is None:
+            index = {}
+            for position, value in enumerate(self.column(*key)):
+                index.setdefault(value, []).append(position)
+            self._hash_indexes[key] = index
+        return index
+
+    def _sorted_index(self, key: Tuple, family: str) -> Tuple[List[Any], List[int]]:
+        index = self._sorted_indexes.get(key + (family,))
+        if index is None:
+            pairs = []
+            for position, value in enumerate(self.column(*key)):
+                sort_key = self._range_key(family, value)
+                if sort_key is not None:
+                    pairs.append((sort_key, position))
+            pairs.sort()
+            index = ([k for k, _ in pairs], [p for _, p in pairs])
+            self._sorted_indexes[key + (family,)] = index
+        return index
+
+    @staticmethod
+    def _range_key(family: str, value: Any) -> Any:
+        if family in _DATE_FILTERS:
+            parsed = _parse_time(value)
+            return parsed.timestamp() if parsed else None
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return None
+        return value
+
+    def _candidates(self, filter_obj: Dict[str, Any]) -> Optional[Set[int]]:
+        """Row positions that may match, or None when no index applies."""
+        if "and" in filter_obj:
+            result: Optional[Set[int]] = None
+            for sub in filter_obj["and"]:
+                found = self._candidates(sub)
+                if found is not None:
+                    result = found if result is None else result & found
+            return result
+        if "or" in filter_obj:
+            union: Set[int] = set()
+            for sub in filter_obj["or"]:
+                found = self._candidates(sub)
+                if found is None:
+                    return None
+                union |= found
+            return union
+
+        family, condition = _leaf_condition(filter_obj)
+        if not isinstance(condition, dict) or len(condition) != 1:
+            return None
+        op, target = next(iter(condition.items()))
+        key = (filter_obj.get("property"), filter_obj.get("timestamp"))
+        if op == "equals" and family in ("select", "status", "checkbox"):
+            return set(self._hash_index(key).get(target, []))
+        if family == "number" or family in _DATE_FILTERS:
+            return self._range_candidates(key, family, op, target)
+        return None
+
+    def _range_candidates(
+        self, key: Tuple, family: str, op: str, target: Any
+    ) -> Optional[Set[int]]:
+        if family in _DATE_FILTERS:
+            if not isinstance(target, str) or len(target) == 10:
+                return None  # date-only and relative conditions compare by day
+            bound = self._range_key(family, target)
+        else:
+            bound = self._range_key(family, target)
+        if bound is None:
+            return None
+        keys, positions = self._sorted_index(key, family)
+        ranges = {
+            "greater_than": (bisect.bisect_right(keys, bound), len(keys)),
+            "after": (bisect.bisect_right(keys, bound), len(keys)),
+            "greater_than_or_equal_to": (bisect.bisect_left(keys, bound), len(keys)),
+            "on_or_after": (bisect.bisect_left(keys, bound), len(keys)),
+            "less_than": (0, bisect.bisect_left(keys, bound)),
+            "before": (0, bisect.bisect_left(keys, bound)),
+            "less_than_or_equal_to": (0, bisect.bisect_right(keys, bound)),
+            "on_or_before": (0, bisect.bisect_right(keys, bound)),
+            "equals": (bisect.bisect_left(keys, bound), bisect.bisect_right(keys, bound)),
+        }
+        if op not in ranges:
+            return None
+        low, high = ranges[op]
+        return set(positions[low:high])
+
+    # -------------------------------------------------------------------------
+    # Evaluation
+    # -------------------------------------------------------------------------
+    def compile(self, filter_obj: Dict[str, Any]) -> Predicate:
+        """Compile a Notion filter object into a predicate over row positions."""
+        if "and" in filter_obj:
+            parts = [self.compile(sub) for sub in filter_obj["and"]]
+            return lambda i: all(part(i) for part in parts)
+        if "or" in filter_obj:
+            parts = [self.compile(sub) for sub in filter_obj["or"]]
+            return lambda i: any(part(i) for part in parts)
+
+        family, condition = _leaf_condition(filter_obj)
+        if family == "formula":
+            test = _formula_test(condition)
+        elif family == "rollup":
+            test = _rollup_test(condition)
+        elif family == "files":
+            test = _value_test("files", condition)
+        else:
+            test = _value_test(family, condition)
+        values = self.column(filter_obj.get("property"), filter_obj.get("timestamp"))
+        return lambda i: test(values[i])
+
+    def _sort_positions(self, positions: List[int], sorts: List[Dict[str, Any]]) -> None:
+        # Stable sorts applied from the last key to the first; empties go last.
+        for spec in reversed(sorts):
+            name, timestamp = spec.get("property"), spec.get("timestamp")
+            values = self.column(name, timestamp)
+            descending = spec.get("direction") == "descending"
+            order = self._option_order(name)
+
+            def sort_key(i: int) -> Tuple[int, int, Any]:
+                # (option rank, type tag, value): options missing from a stale
+                # schema sort after known ones, and mixed types (e.g. formula
+                # results) group by type instead of comparing directly.
+                value = values[i]
+                if isinstance(value, list):
+                    value = ", ".join(str(v) for v in value)
+                rank = 0
+                if order is not None:
+                    rank = order.get(value, len(order))
+                if isinstance(value, (bool, int, float)):
+                    return rank, 0, value
+                if isinstance(value, str):
+                    if timestamp or self._is_date(name):
+                        try:
+                            return rank, 0, _parse_time(value).timestamp()
+                        except ValueError:
+                            pass
+                    return rank, 1, value.casefold()
+                return rank, 2, str(value).casefold()
+
+            present = [i for i in positions if not _is_empty(values[i])]
+            empty = [i for i in positions if _is_empty(values[i])]
+            present.sort(key=sort_key, reverse=descending)
+            positions[:] = present + empty
+
+    def _option_order(self, name: Optional[str]) -> Optional[Dict[str, int]]:
+        schema = self.schema.get(name or "") or {}
+        kind = schema.get("type")
+        if kind not in ("select", "status"):
+            return None
+        options = (schema.get(kind) or {}).get("options", [])
+        return {option.get("name"): position for position, option in enumerate(options)}
+
+    def _is_date(self, name: Optional[str]) -> bool:
+        schema = self.schema.get(name or "") or {}
+        return schema.get("type") in _DATE_FILTERS
+
+    def query(
+        self,
+        filter_obj: Optional[Dict[str, Any]] = None,
+        sorts: Optional[List[Dict[str, Any]]] = None,
+        page_size: int = 100,
+        start_cursor: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Evaluate a query and return one page of results in the API's shape."""
+        if filter_obj:
+            candidates = self._candidates(filter_obj)
+            positions = sorted(candidates) if candidates is not None else range(len(self))
+            predicate = self.compile(filter_obj)
+            matched = [i for i in positions if predicate(i)]
+        else:
+            matched = list(range(len(self)))
+        if sorts:
+            self._sort_positions(matched, sorts)
+
+        offset = int(start_cursor) if start_cursor else 0
+        page_size = max(1, min(page_size, 100))
+        window = matched[offset:offset + page_size]
+        has_more = offset + page_size < len(matched)
+        return {
+            "object": "list",
+            "results": [self.rows[i] for i in window],
+            "next_cursor": str(offset + page_size) if has_more else None,
+            "has_more": has_more,
+            "type": "page_or_database",
+            "page_or_database": {},
+        }
+
+
+# -----------------------------------------------------------------------------
+# Engine
+# -----------------------------------------------------------------------------
+class LocalQueryEngine:
+    """
+    Serves ``query_database`` calls from local copies of databases.
+
+    Copies come from ``mirror`` when it holds the database, otherwise from
+    one unfiltered pass through the API; either is reused until ``ttl_s``
+    elapses or ``invalidate`` is called for the database or one of its rows.
+    """
+
+    def __init__(
+        self,
+        client: Optional[NotionClient] = None,
+        mirror: Optional[Any] = None,
+        ttl_s: float = 30.0,
+    ):
+        if client is None and mirror is None:
+            raise ValueError("LocalQueryEngine needs a client or a mirror")
+        self.client = client
+        self.mirror = mirror
+        self.ttl_s = ttl_s
+        self._databases: Dict[str, LocalDatabase] = {}
+        self._loading: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.loads = 0
+
+    async def database(self, database_id: str) -> LocalDatabase:
+        """The local copy of a database, loading or refreshing it if stale."""
+        key = _id_key(database_id)
+        local = self._databases.get(key)
+        if local is not None and time.monotonic() - local.loaded_at < self.ttl_s:
+            self.hits += 1
+            return local
+        loading = self._loading.get(key)
+        if loading is None:
+            loading = asyncio.ensure_future(self._load(database_id))
+            self._loading[key] = loading
+            loading.add_done_callback(lambda _: self._loading.pop(key, None))
+        local = await asyncio.shield(loading)
+        self._databases[key] = local
+        return local
+
+    async def _load(self, database_id: str) -> LocalDatabase:
+        self.loads += 1
+        if self.mirror is not None:
+            database = self.mirror.get(database_id)
+            if database is not None:
+                return LocalDatabase(database, self.mirror.pages(database_id=database_id))
+        if self.client is None:
+            raise KeyError(f"Database not mirrored: {database_id}")
+        database = await self.client.get_database(database_id)
+        rows = [row async for row in self.client.iter_query_database(database_id)]
+        return LocalDatabase(database, rows)
+
+    async def query_database(
+        self,
+        database_id: str,
+        filter_obj: Optional[Dict] = None,
+        sorts: Optional[List[Dict]] = None,
+        page_size: int = 100,
+        start_cursor: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Drop-in for ``NotionClient.query_database`` evaluated locally."""
+        local = await self.database(database_id)
+        return local.query(filter_obj, sorts, page_size, start_cursor)
+
+    def invalidate(self, object_id: Optional[str] = None) -> None:
+        """Drop the copy of a database, or of any database containing a row."""
+        if object_id is None:
+            self._databases.clear()
+            return
+        key = _id_key(object_id)
+        for database_id, local in list(self._databases.items()):
+            if database_id == key or key in local.row_ids:
+                del self._databases[database_id]
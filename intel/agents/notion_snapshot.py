@@ -0,0 +1,519 @@
+"""
+Notion Workspace Snapshots
+==========================
+Streams every page, database schema, database row and block tree the
+integration can see into one compressed JSONL file, and restores such a
+file under a target page.
+
+Usage:
+    python notion_agent.py --export workspace.jsonl.gz
+    python notion_agent.py --export workspace.jsonl.zst      # needs zstandard
+    python notion_agent.py --import workspace.jsonl.gz PARENT_PAGE_ID
+
+Or from code:
+    report = await export_snapshot(client, "workspace.jsonl.gz")
+    report = await restore_snapshot(client, "workspace.jsonl.gz", parent_id)
+
+Files ending in ``.zst`` are zstd-compressed (optional ``zstandard``
+package); anything else is gzip. The first line is a header, the last an
+``end`` record with counts, and every line between is one database or one
+page with its block tree.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import gzip
+import json
+import os
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import IO, Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from notion_agent import NotionClient
+from notion_sync import object_title
+
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
+
+SNAPSHOT_VERSION = 1
+
+# Placeholders for pages and databases, which are restored as their own records.
+_CHILD_OBJECT_BLOCK_TYPES = frozenset({"child_page", "child_database"})
+# Blocks the API can't create.
+_SKIPPED_BLOCK_TYPES = frozenset({"unsupported", "link_preview", "template"})
+_MEDIA_BLOCK_TYPES = frozenset({"image", "video", "file", "pdf", "audio"})
+# Schema types that point at other databases by ID and can't be replayed.
+_UNRESTORABLE_PROPERTY_TYPES = frozenset({"relation", "rollup"})
+_COMPUTED_PROPERTY_TYPES = frozenset(
+    {
+        "formula",
+        "rollup",
+        "relation",
+        "created_time",
+        "created_by",
+        "last_edited_time",
+        "last_edited_by",
+        "unique_id",
+        "verification",
+        "button",
+    }
+)
+
+
+@dataclass
+class SnapshotReport:
+    """Counts and timing for one export or restore."""
+    pages: int = 0
+    databases: int = 0
+    blocks: int = 0
+    bytes: int = 0
+    duration_s: float = 0.0
+    errors: List[str] = field(default_factory=list)
+    # What could not be carried over, e.g. {"block:image": 3, "property:relation": 1}.
+    skipped: Dict[str, int] = field(default_factory=dict)
+    # Source object ID -> restored object ID (restore only).
+    id_map: Dict[str, str] = field(default_factory=dict)
+    _start: float = field(default_factory=time.perf_counter, repr=False)
+
+    @property
+    def objects(self) -> int:
+        return self.pages + self.databases
+
+    @property
+    def objects_per_s(self) -> float:
+        elapsed = self.duration_s or (time.perf_counter() - self._start)
+        return self.objects / elapsed if elapsed else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"{self.pages} pages, {self.databases} databases, {self.blocks} blocks "
+            f"in {self.duration_s:.1f}s ({self.objects_per_s:.1f} objects/s, "
+            f"{self.bytes / 1024:,.0f} KB)"
+        )
+
+
+def open_snapshot(path: str, mode: str) -> IO[str]:
+    """Open a snapshot file for text reading ("r") or writing ("w")."""
+    path = os.path.expanduser(path)
+    if path.endswith(".zst"):
+        if not HAS_ZSTD:
+            raise RuntimeError("zstandard is required for .zst snapshots")
+        return zstandard.open(path, mode + "t", encoding="utf-8")
+    return gzip.open(path, mode + "t", encoding="utf-8", compresslevel=6)
+
+
+def progress_printer(
+    label: str, interval_s: float = 0.5
+) -> Callable[[SnapshotReport], None]:
+    """Progress callback that rewrites one status line on stderr."""
+    last = [0.0]
+
+    def report(progress: SnapshotReport) -> None:
+        now = time.perf_counter()
+        if now - last[0] < interval_s:
+            return
+        last[0] = now
+        sys.stderr.write(
+            f"\r{label}: {progress.objects} objects, {progress.blocks} blocks "
+            f"({progress.objects_per_s:.1f} objects/s)"
+        )
+        sys.stderr.flush()
+
+    return report
+
+
+def _parent_ref(obj: Dict[str, Any]) -> Tuple[str, Optional[str]]:
+    parent = obj.get("parent") or {}
+    parent_type = parent.get("type") or next(iter(parent), "workspace")
+    return parent_type, parent.get(parent_type) if parent_type != "workspace" else None
+
+
+def _count_blocks(blocks: List[Dict[str, Any]]) -> int:
+    return sum(1 + _count_blocks(b.get("children") or []) for b in blocks)
+
+
+def _block_ids(blocks: List[Dict[str, Any]]) -> Iterator[str]:
+    for block in blocks:
+        yield block["id"]
+        yield from _block_ids(block.get("children") or [])
+
+
+# -----------------------------------------------------------------------------
+# Export
+# -----------------------------------------------------------------------------
+async def export_snapshot(
+    client: NotionClient,
+    path: str,
+    concurrency: int = 8,
+    progress: Optional[Callable[[SnapshotReport], None]] = None,
+) -> SnapshotReport:
+    """
+    Write every object the integration can see to ``path``.
+
+    Search results are streamed and up to ``concurrency`` block trees are
+    fetched at once; each page is written as soon as its tree arrives, so
+    memory stays bounded by the fetches in flight rather than the workspace.
+    Pages whose tree can't be fetched are left out and listed in ``errors``.
+    """
+    report = SnapshotReport()
+    pending: Set[asyncio.Future] = set()
+
+    async def fetch(page: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            blocks = await client.get_block_tree(page["id"])
+        except Exception as e:
+            raise RuntimeError(f"{page['id']}: {e}") from e
+        return {"type": "page", "data": page, "blocks": blocks}
+
+    def write(out: IO[str], record: Dict[str, Any]) -> None:
+        out.write(json.dumps(record, separators=(",", ":")) + "\n")
+        if record["type"] == "page":
+            report.pages += 1
+            report.blocks += _count_blocks(record["blocks"])
+        elif record["type"] == "database":
+            report.databases += 1
+        if progress is not None:
+            progress(report)
+
+    def drain(out: IO[str], done: Set[asyncio.Future]) -> None:
+        for task in done:
+            if task.exception() is not None:
+                report.errors.append(str(task.exception()))
+            else:
+                write(out, task.result())
+
+    with open_snapshot(path, "w") as out:
+        header = {
+            "type": "snapshot",
+            "version": SNAPSHOT_VERSION,
+            "exported_at": datetime.now(timezone.utc).isoformat(),
+        }
+        out.write(json.dumps(header) + "\n")
+        try:
+            async for obj in client.iter_search():
+                if obj.get("archived") or obj.get("in_trash"):
+                    continue
+                if obj.get("object") == "database":
+                    write(out, {"type": "database", "data": obj})
+                    continue
+                if len(pending) >= concurrency:
+                    done, pending = await asyncio.wait(
+                        pending, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    drain(out, done)
+                pending.add(asyncio.ensure_future(fetch(obj)))
+            if pending:
+                done, pending = await asyncio.wait(pending)
+                drain(out, done)
+        finally:
+            for task in pending:
+                task.cancel()
+        end = {
+            "type": "end",
+            "pages": report.pages,
+            "databases": report.databases,
+            "blocks": report.blocks,
+        }
+        out.write(json.dumps(end) + "\n")
+
+    report.bytes = os.path.getsize(os.path.expanduser(path))
+    report.duration_s = time.perf_counter() - report._start
+    return report
+
+
+def read_snapshot(path: str) -> Iterator[Dict[str, Any]]:
+    """Yield the object records of a snapshot, checking its header and end."""
+    with open_snapshot(path, "r") as f:
+        header = json.loads(f.readline() or "{}")
+        if header.get("type") != "snapshot":
+            raise ValueError(f"{path} is not a Notion snapshot")
+        if header.get("version", 0) > SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot version {header['version']}")
+        for line in f:
+            record = json.loads(line)
+            if record["type"] == "end":
+                return
+            yield record
+    raise ValueError(f"{path} is truncated (no end record)")
+
+
+# -----------------------------------------------------------------------------
+# Restore
+# -----------------------------------------------------------------------------
+def _writable_rich_text(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Strip response-only fields; mentions become their plain text."""
+    written = []
+    for item in items or []:
+        annotations = item.get("annotations")
+        if item.get("type") == "equation":
+            value: Dict[str, Any] = {"type": "equation", "equation": item["equation"]}
+        elif item.get("type", "text") == "text" and "text" in item:
+            text = item["text"]
+            value = {"type": "text", "text": {"content": text.get("content", "")}}
+            if text.get("link"):
+                value["text"]["link"] = text["link"]
+        else:
+            value = {"type": "text", "text": {"content": item.get("plain_text", "")}}
+        if annotations:
+            value["annotations"] = annotations
+        written.append(value)
+    return written
+
+
+def _writable_block(block: Dict[str, Any], skipped: Counter) -> Optional[Dict[str, Any]]:
+    """Turn a fetched block (with ``children``) into an append payload."""
+    kind = block.get("type")
+    data = dict(block.get(kind) or {})
+    if kind in _CHILD_OBJECT_BLOCK_TYPES:
+        return None
+    if kind in _SKIPPED_BLOCK_TYPES or (kind == "synced_block" and data.get("synced_from")):
+        skipped[f"block:{kind}"] += 1
+        return None
+    if kind in _MEDIA_BLOCK_TYPES:
+        # Notion-hosted files are signed, expiring URLs and can't be re-sent.
+        if data.get("type") != "external":
+            skipped[f"block:{kind}"] += 1
+            return None
+        data = {
+            "type": "external",
+            "external": data["external"],
+            "caption": data.get("caption", []),
+        }
+    for key in ("rich_text", "caption"):
+        if key in data:
+            data[key] = _writable_rich_text(data[key])
+    if "cells" in data:
+        data["cells"] = [_writable_rich_text(cell) for cell in data["cells"]]
+    children = [
+        child
+        for child in (_writable_block(b, skipped) for b in block.get("children") or [])
+        if child is not None
+    ]
+    if children:
+        data["children"] = children
+    return {"object": "block", "type": kind, kind: data}
+
+
+def _writable_schema(
+    properties: Dict[str, Any], skipped: Counter
+) -> Dict[str, Dict[str, Any]]:
+    """Property configs for ``create_database`` from a fetched schema."""
+    schema = {}
+    for name, config in properties.items():
+        kind = config.get("type")
+        if kind in _UNRESTORABLE_PROPERTY_TYPES:
+            skipped[f"property:{kind}"] += 1
+            continue
+        options = config.get(kind) or {}
+        if kind in ("select", "multi_select", "status"):
+            options = {
+                "options": [
+                    {"name": o["name"], "color": o.get("color", "default")}
+                    for o in options.get("options", [])
+                ]
+            }
+        elif kind == "formula":
+            options = {"expression": options.get("expression", "")}
+        elif kind == "number":
+            options = {"format": options.get("format", "number")}
+        else:
+            options = {}
+        schema[name] = {kind: options}
+    return schema
+
+
+def _writable_value(prop: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """A page property value as ``create_page`` expects it, or None to drop it."""
+    kind = prop.get("type")
+    value = prop.get(kind)
+    if kind in _COMPUTED_PROPERTY_TYPES:
+        return None
+    if kind in ("title", "rich_text"):
+        return {kind: _writable_rich_text(value)}
+    if kind in ("select", "status"):
+        return {kind: {"name": value["name"]} if value else None}
+    if kind == "multi_select":
+        return {kind: [{"name": option["name"]} for option in value or []]}
+    if kind == "people":
+        return {kind: [{"id": person["id"]} for person in value or []]}
+    if kind == "files":
+        # Notion-hosted files are signed, expiring URLs; only links carry over.
+        return {kind: [f for f in value or [] if f.get("type") == "external"]}
+    return {kind: value}
+
+
+def _source_parent(
+    obj: Dict[str, Any], block_pages: Dict[str, str]
+) -> Tuple[str, Optional[str]]:
+    """An object's parent in the snapshot; blocks resolve to their page."""
+    parent_type, parent_id = _parent_ref(obj)
+    if parent_type == "block_id" and parent_id in block_pages:
+        return "page_id", block_pages[parent_id]
+    return parent_type, parent_id
+
+
+def _restore_parent(
+    record: Dict[str, Any],
+    id_map: Dict[str, str],
+    block_pages: Dict[str, str],
+    target_id: str,
+) -> Tuple[str, str]:
+    """Where to recreate an object: its restored parent, or ``target_id``."""
+    parent_type, parent_id = _source_parent(record["data"], block_pages)
+    if parent_id in id_map:
+        if record["type"] == "page" and parent_type == "database_id":
+            return "database_id", id_map[parent_id]
+        if parent_type != "database_id":
+            return "page_id", id_map[parent_id]
+    return "page_id", target_id
+
+
+def _plan_levels(path: str) -> Tuple[Dict[str, int], Dict[str, str]]:
+    """
+    Depth of each object below the snapshot's roots, and block -> page IDs.
+
+    Objects are restored one depth level at a time so parents always exist
+    before their children; only IDs are held in memory.
+    """
+    objects: Dict[str, Dict[str, Any]] = {}
+    block_pages: Dict[str, str] = {}
+    for record in read_snapshot(path):
+        obj = record["data"]
+        objects[obj["id"]] = {"parent": obj.get("parent")}
+        for block_id in _block_ids(record.get("blocks") or []):
+            block_pages[block_id] = obj["id"]
+
+    depths: Dict[str, int] = {}
+    for object_id in objects:
+        chain = []
+        current: Optional[str] = object_id
+        while current is not None and current not in depths and current not in chain:
+            chain.append(current)
+            parent = _source_parent(objects[current], block_pages)[1]
+            current = parent if parent in objects else None
+        depth = depths.get(current, -1) if current is not None else -1
+        for node in reversed(chain):
+            depth += 1
+            depths[node] = depth
+    return depths, block_pages
+
+
+async def restore_snapshot(
+    client: NotionClient,
+    path: str,
+    parent_page_id: str,
+    concurrency: int = 4,
+    progress: Optional[Callable[[SnapshotReport], None]] = None,
+) -> SnapshotReport:
+    """
+    Recreate a snapshot's pages, databases, rows and content under a page.
+
+    Objects are created a depth level at a time (one streaming pass over the
+    file per level), ``concurrency`` at once, with content appended through
+    ``append_blocks`` so large trees are chunked to the API's limits. All
+    writes share the client's rate limiter.
+
+    Creates go through the client's ``journal`` keyed by source ID and
+    target, so re-running an interrupted restore with a persistent journal
+    picks up where it stopped instead of duplicating objects. Relation and
+    rollup columns, Notion-hosted files and mentions' targets can't be
+    carried over; they are counted in ``skipped``.
+    """
+    report = SnapshotReport()
+    skipped: Counter = Counter()
+    journal = client.journal
+    depths, block_pages = _plan_levels(path)
+
+    async def restore(record: Dict[str, Any]) -> None:
+        obj = record["data"]
+        key = f"snapshot:{obj['id']}:{parent_page_id}"
+        parent_type, parent_id = _restore_parent(
+            record, report.id_map, block_pages, parent_page_id
+        )
+        title = object_title(obj) or "Untitled"
+
+        if record["type"] == "database":
+            database = await client.create_database(
+                parent_id,
+                title,
+                _writable_schema(obj.get("properties", {}), skipped),
+                is_inline=bool(obj.get("is_inline")),
+                idempotency_key=key,
+            )
+            report.id_map[obj["id"]] = database["id"]
+            report.databases += 1
+            return
+
+        properties = None
+        if parent_type == "database_id":
+            properties = {}
+            for name, prop in obj.get("properties", {}).items():
+                value = _writable_value(prop)
+                if value is None:
+                    skipped[f"property:{prop.get('type')}"] += 1
+                else:
+                    properties[name] = value
+        icon, cover = obj.get("icon"), obj.get("cover")
+        page = await client.create_page(
+            parent_type=parent_type,
+            parent_id=parent_id,
+            title=title,
+            properties=properties,
+            icon=icon if icon and icon.get("type") in ("emoji", "external") else None,
+            cover=cover if cover and cover.get("type") == "external" else None,
+            idempotency_key=key,
+        )
+        report.id_map[obj["id"]] = page["id"]
+        blocks = [
+            block
+            for block in (_writable_block(b, skipped) for b in record.get("blocks") or [])
+            if block is not None
+        ]
+        if blocks and "content" not in journal.get(key).get("steps", []):
+            await client.append_blocks(page["id"], blocks)
+            journal.mark(key, "content")
+        report.pages += 1
+        report.blocks += _count_blocks(record.get("blocks") or [])
+
+    def collect(done: Set[asyncio.Future]) -> None:
+        for task in done:
+            if task.exception() is not None:
+                report.errors.append(str(task.exception()))
+            elif progress is not None:
+                progress(report)
+
+    for level in range(max(depths.values(), default=-1) + 1):
+        pending: Set[asyncio.Future] = set()
+        try:
+            for record in read_snapshot(path):
+                obj_id = record["data"]["id"]
+                if depths.get(obj_id) != level:
+                    continue
+                parent_id = _source_parent(record["data"], block_pages)[1]
+                if parent_id in depths and parent_id not in report.id_map:
+                    report.errors.append(f"{obj_id}: parent was not restored")
+                    continue
+                if len(pending) >= concurrency:
+                    done, pending = await asyncio.wait(
+                        pending, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    collect(done)
+                pending.add(asyncio.ensure_future(restore(record)))
+            if pending:
+                done, pending = await asyncio.wait(pending)
+                collect(done)
+        finally:
+            for task in pending:
+                task.cancel()
+
+    report.skipped = dict(skipped)
+    report.bytes = os.path.getsize(os.path.expanduser(path))
+    report.duration_s = time.perf_counter() - report._start
+    return report
@@ -0,0 +1,343 @@
+"""
+Notion Workspace Mirror
+=======================
+Keeps a local SQLite copy of every page and database the integration can
+see, using `last_edited_time` as a high-water mark so each sync only pulls
+what changed since the previous one.
+
+Usage:
+    python notion_sync.py --db ~/.notion/mirror.db
+    python notion_sync.py --db ~/.notion/mirror.db --full
+
+The mirror can be queried without touching the API:
+    mirror = WorkspaceMirror(client, "mirror.db")
+    await mirror.sync()
+    mirror.pages(database_id="...")
+    mirror.page_text(page_id)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from notion_agent import NotionClient, blocks_to_text
+
+
+def object_title(obj: Dict[str, Any]) -> str:
+    """Extract the title from a page or database object."""
+    for prop in obj.get("properties", {}).values():
+        if isinstance(prop, dict) and prop.get("type") == "title":
+            return "".join(t.get("plain_text", "") for t in prop.get("title", []))
+    return "".join(t.get("plain_text", "") for t in obj.get("title", []) or [])
+
+
+def _parent_ref(obj: Dict[str, Any]) -> Tuple[str, Optional[str]]:
+    parent = obj.get("parent") or {}
+    parent_type = parent.get("type", "")
+    return parent_type, parent.get(parent_type) if parent_type != "workspace" else None
+
+
+@dataclass
+class SyncReport:
+    """Summary of one sync run."""
+    scanned: int = 0
+    changed_pages: int = 0
+    changed_databases: int = 0
+    removed: int = 0
+    duration_s: float = 0.0
+    high_water_mark: Optional[str] = None
+    full: bool = False
+    errors: List[str] = field(default_factory=list)
+
+
+class WorkspaceMirror:
+    """
+    Local mirror of a Notion workspace backed by one SQLite file.
+
+    ``sync()`` walks search results newest-first and stops at the previous
+    high-water mark, refetching block trees only for pages that changed.
+    Notion rounds ``last_edited_time`` to the minute, so objects stamped with
+    the high-water minute itself are always re-read.
+    """
+
+    _SCHEMA = (
+        """CREATE TABLE IF NOT EXISTS objects (
+            id TEXT PRIMARY KEY,
+            object TEXT NOT NULL,
+            parent_type TEXT,
+            parent_id TEXT,
+            title TEXT,
+            last_edited_time TEXT,
+            archived INTEGER NOT NULL DEFAULT 0,
+            data TEXT NOT NULL
+        )""",
+        "CREATE INDEX IF NOT EXISTS objects_parent ON objects (parent_id)",
+        "CREATE INDEX IF NOT EXISTS objects_edited ON objects (last_edited_time)",
+        """CREATE TABLE IF NOT EXISTS content (
+            page_id TEXT PRIMARY KEY,
+            last_edited_time TEXT,
+            tree TEXT NOT NULL,
+            text TEXT NOT NULL
+        )""",
+        """CREATE TABLE IF NOT EXISTS sync_state (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )""",
+    )
+
+    def __init__(self, client: NotionClient, path: str, concurrency: int = 4):
+        self.client = client
+        self.path = os.path.expanduser(path)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.concurrency = concurrency
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            for statement in self._SCHEMA:
+                self._conn.execute(statement)
+
+    # -------------------------------------------------------------------------
+    # Sync
+    # -------------------------------------------------------------------------
+    @property
+    def high_water_mark(self) -> Optional[str]:
+        row = self._conn.execute(
+            "SELECT value FROM sync_state WHERE key = 'high_water_mark'"
+        ).fetchone()
+        return row[0] if row else None
+
+    async def sync(self, full: bool = False) -> SyncReport:
+        """
+        Pull objects edited since the last sync (or everything if ``full``).
+
+        A full sync also drops local objects the integration can no longer
+        see (deleted, archived or unshared).
+        """
+        start = time.perf_counter()
+        report = SyncReport(full=full)
+        mark = None if full else self.high_water_mark
+        newest = mark
+        seen: Set[str] = set()
+        pending: Set[asyncio.Future] = set()
+
+        async for obj in self.client.iter_search():
+            edited = obj.get("last_edited_time") or ""
+            if mark and edited < mark:
+                break
+            report.scanned += 1
+            seen.add(obj["id"])
+            if newest is None or edited > newest:
+                newest = edited
+            if not self._upsert_object(obj, force=bool(mark) and edited == mark):
+                continue
+            if obj.get("object") == "database":
+                report.changed_databases += 1
+                continue
+            report.changed_pages += 1
+            if len(pending) >= self.concurrency:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                self._collect(done, report)
+            pending.add(asyncio.ensure_future(self._sync_content(obj)))
+
+        if pending:
+            done, _ = await asyncio.wait(pending)
+            self._collect(done, report)
+        if full:
+            report.removed = self._remove_unseen(seen)
+        if newest and not report.errors:
+            self._set_state("high_water_mark", newest)
+        report.high_water_mark = self.high_water_mark
+        report.duration_s = time.perf_counter() - start
+        return report
+
+    def _collect(self, done: Set[asyncio.Future], report: SyncReport) -> None:
+        for task in done:
+            if task.exception() is not None:
+                report.errors.append(str(task.exception()))
+
+    def _upsert_object(self, obj: Dict[str, Any], force: bool = False) -> bool:
+        """Store an object. Returns False if the stored copy is already current."""
+        edited = obj.get("last_edited_time")
+        row = self._conn.execute(
+            "SELECT last_edited_time FROM objects WHERE id = ?", (obj["id"],)
+        ).fetchone()
+        if row is not None and row[0] == edited and not force:
+            return False
+        parent_type, parent_id = _parent_ref(obj)
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO objects VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    obj["id"],
+                    obj.get("object", "page"),
+                    parent_type,
+                    parent_id,
+                    object_title(obj),
+                    edited,
+                    int(bool(obj.get("archived"))),
+                    json.dumps(obj),
+                ),
+            )
+        return True
+
+    async def _sync_content(self, page: Dict[str, Any]) -> None:
+        """
+        Store the block tree and text of a page the delta pass saw change.
+
+        The page's entries in the client's ResponseCache / ContentStore are
+        dropped first, so the tree is fetched fresh rather than served from
+        a copy older than the ``last_edited_time`` recorded with it.
+        """
+        self.client.invalidate(page["id"])
+        try:
+            tree = await self.client.get_block_tree(page["id"])
+        except Exception:
+            # Forget the object so the next sync retries its content.
+            with self._conn:
+                self._conn.execute("DELETE FROM objects WHERE id = ?", (page["id"],))
+            raise
+        text = blocks_to_text(tree)
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO content VALUES (?, ?, ?, ?)",
+                (page["id"], page.get("last_edited_time"), json.dumps(tree), text),
+            )
+
+    def _remove_unseen(self, seen: Set[str]) -> int:
+        stored = {row[0] for row in self._conn.execute("SELECT id FROM objects")}
+        stale = stored - seen
+        with self._conn:
+            self._conn.executemany(
+                "DELETE FROM objects WHERE id = ?", [(i,) for i in stale]
+            )
+            self._conn.executemany(
+                "DELETE FROM content WHERE page_id = ?", [(i,) for i in stale]
+            )
+        return len(stale)
+
+    def _set_state(self, key: str, value: str) -> None:
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sync_state VALUES (?, ?)", (key, value)
+            )
+
+    # -------------------------------------------------------------------------
+    # Local Queries
+    # -------------------------------------------------------------------------
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM objects").fetchone()[0]
+
+    def get(self, object_id: str) -> Optional[Dict[str, Any]]:
+        """Return a mirrored page or database object."""
+        row = self._conn.execute(
+            "SELECT data FROM objects WHERE id = ?", (object_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def pages(
+        self,
+        parent_id: Optional[str] = None,
+        database_id: Optional[str] = None,
+        edited_since: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Mirrored pages, optionally filtered by parent page or database."""
+        sql = "SELECT data FROM objects WHERE object = 'page'"
+        args: List[Any] = []
+        if parent_id or database_id:
+            sql += " AND parent_id = ?"
+            args.append(database_id or parent_id)
+        if edited_since:
+            sql += " AND last_edited_time >= ?"
+            args.append(edited_since)
+        sql += " ORDER BY last_edited_time DESC"
+        return [json.loads(row[0]) for row in self._conn.execute(sql, args)]
+
+    def databases(self) -> List[Dict[str, Any]]:
+        """Mirrored database objects (schemas)."""
+        return [
+            json.loads(row[0])
+            for row in self._conn.execute(
+                "SELECT data FROM objects WHERE object = 'database' ORDER BY title"
+            )
+        ]
+
+    def find_by_title(self, text: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Case-insensitive substring match on titles."""
+        return [
+            json.loads(row[0])
+            for row in self._conn.execute(
+                "SELECT data FROM objects WHERE title LIKE ? "
+                "ORDER BY last_edited_time DESC LIMIT ?",
+                (f"%{text}%", limit),
+            )
+        ]
+
+    def block_tree(self, page_id: str) -> Optional[List[Dict[str, Any]]]:
+        row = self._conn.execute(
+            "SELECT tree FROM content WHERE page_id = ?", (page_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def content_versions(self) -> Dict[str, Optional[str]]:
+        """page_id -> last_edited_time of every page with mirrored content."""
+        return dict(self._conn.execute("SELECT page_id, last_edited_time FROM content"))
+
+    def page_text(self, page_id: str) -> Optional[str]:
+        row = self._conn.execute(
+            "SELECT text FROM content WHERE page_id = ?", (page_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+async def main():
+    """Sync a workspace mirror from the command line."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Notion workspace mirror")
+    parser.add_argument("--db", default="~/.notion/mirror.db", help="Mirror database path")
+    parser.add_argument("--full", action="store_true", help="Full crawl instead of delta sync")
+    parser.add_argument("--index", help="Also refresh a knowledge index (NOTION_INDEX_PATH)")
+    args = parser.parse_args()
+
+    client = NotionClient()
+    mirror = WorkspaceMirror(client, args.db)
+    try:
+        report = await mirror.sync(full=args.full)
+        print(
+            f"Scanned {report.scanned} objects in {report.duration_s:.1f}s: "
+            f"{report.changed_pages} pages and {report.changed_databases} databases "
+            f"changed, {report.removed} removed"
+        )
+        for error in report.errors:
+            print(f"Error: {error}")
+        print(f"High-water mark: {report.high_water_mark}")
+        if args.index:
+            from notion_index import KnowledgeIndex
+
+            index = KnowledgeIndex(args.index)
+            try:
+                counts = index.sync_from(mirror)
+            finally:
+                index.close()
+            print(f"Index: {counts['updated']} pages updated, {counts['removed']} removed")
+    finally:
+        mirror.close()
+        await client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,375 @@
+"""
+Notion Vector Index
+===================
+In-process semantic retrieval over workspace content.
+
+Chunk embeddings live in one contiguous float32 matrix (optionally int8
+quantized with a per-row scale) that is saved as `.npy` files and
+memory-mapped on load. Queries are a single matrix product plus a partial
+sort, so top-k over hundreds of thousands of chunks stays in-process.
+
+Embedders are any callable mapping a list of strings to an (n, dim)
+float32 array. `HashingEmbedder` is a deterministic, dependency-free
+default that is also suitable for tests:
+
+    index = VectorIndex(embedder=HashingEmbedder())
+    index.sync_from(mirror)
+    agent = NotionAgent(knowledge_index=index)
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from notion_agent import blocks_to_text
+from notion_index import CHUNK_CHARS
+from notion_sync import object_title
+
+Embedder = Callable[[Sequence[str]], np.ndarray]
+
+_HEADING_TYPES = frozenset({"heading_1", "heading_2", "heading_3"})
+_SCORE_BLOCK_ROWS = 65536
+
+
+class HashingEmbedder:
+    """
+    Deterministic feature-hashing embedder (unigrams and bigrams).
+
+    Not a semantic model, but stable across processes and machines, so it
+    works as a zero-dependency fallback and for reproducible tests.
+    """
+
+    def __init__(self, dim: int = 1024):
+        self.dim = dim
+
+    def _features(self, text: str) -> List[str]:
+        tokens = re.findall(r"\w+", text.lower())
+        return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+    def __call__(self, texts: Sequence[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                digest = hashlib.blake2b(feature.encode(), digest_size=8).digest()
+                value = int.from_bytes(digest, "little")
+                out[row, value % self.dim] += 1.0 if value >> 63 else -1.0
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        np.divide(out, norms, out=out, where=norms > 0)
+        return out
+
+
+def chunk_blocks(
+    blocks: List[Dict[str, Any]], size: int = CHUNK_CHARS
+) -> List[Tuple[str, str]]:
+    """
+    Group a page's top-level blocks into ``(chunk_id, text)`` passages.
+
+    Chunks break at headings or once they reach ``size`` characters and are
+    keyed by their first block's ID, so an edit only changes the chunk that
+    contains it.
+    """
+    chunks: List[Tuple[str, str]] = []
+    chunk_id: Optional[str] = None
+    lines: List[str] = []
+    length = 0
+    for block in blocks:
+        text = blocks_to_text([block])
+        starts_section = block.get("type") in _HEADING_TYPES
+        if chunk_id is not None and (starts_section or length >= size):
+            chunks.append((chunk_id, "\n".join(lines)))
+            chunk_id, lines, length = None, [], 0
+        if chunk_id is None:
+            chunk_id = block.get("id", str(len(chunks)))
+        if text:
+            lines.append(text)
+            length += len(text) + 1
+    if chunk_id is not None:
+        chunks.append((chunk_id, "\n".join(lines)))
+    return [(cid, text) for cid, text in chunks if text.strip()]
+
+
+def _text_hash(text: str) -> str:
+    return hashlib.blake2b(text.encode(), digest_size=12).hexdigest()
+
+
+class VectorIndex:
+    """
+    Embedding matrix with row bookkeeping keyed by (page_id, chunk_id).
+
+    Updating a page re-embeds only chunks whose text changed; rows of
+    removed chunks are tombstoned and reused by later inserts.
+    """
+
+    def __init__(
+        self,
+        embedder: Optional[Embedder] = None,
+        dim: Optional[int] = None,
+        quantize: bool = False,
+    ):
+        self.embedder = embedder or HashingEmbedder()
+        self.dim = dim or getattr(self.embedder, "dim", None)
+        self.quantize = quantize
+        self._matrix: Optional[np.ndarray] = None
+        self._scales = np.zeros(0, dtype=np.float32)
+        self._alive = np.zeros(0, dtype=bool)
+        self._size = 0
+        self._free: List[int] = []
+        self._row_keys: List[Optional[Tuple[str, str]]] = []
+        self._snippets: List[str] = []
+        self._rows: Dict[Tuple[str, str], Tuple[int, str]] = {}
+        self._page_chunks: Dict[str, Set[str]] = {}
+        self._pages: Dict[str, Dict[str, Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    # -------------------------------------------------------------------------
+    # Storage
+    # -------------------------------------------------------------------------
+    def _ensure_capacity(self, extra: int) -> None:
+        needed = self._size + extra
+        capacity = 0 if self._matrix is None else self._matrix.shape[0]
+        if needed <= capacity and self._matrix.flags.writeable:
+            return
+        new_capacity = max(needed, capacity * 2, 1024)
+        dtype = np.int8 if self.quantize else np.float32
+        matrix = np.zeros((new_capacity, self.dim), dtype=dtype)
+        scales = np.zeros(new_capacity, dtype=np.float32)
+        alive = np.zeros(new_capacity, dtype=bool)
+        if self._matrix is not None:
+            matrix[: self._size] = self._matrix[: self._size]
+            scales[: self._size] = self._scales[: self._size]
+            alive[: self._size] = self._alive[: self._size]
+        self._matrix, self._scales, self._alive = matrix, scales, alive
+
+    def _write_rows(self, rows: List[int], vectors: np.ndarray) -> None:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.quantize:
+            scales = np.abs(vectors).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            self._matrix[rows] = np.round(vectors / scales[:, None]).astype(np.int8)
+            self._scales[rows] = scales
+        else:
+            self._matrix[rows] = vectors
+            self._scales[rows] = 1.0
+        self._alive[rows] = True
+
+    def _allocate(self, count: int) -> List[int]:
+        self._ensure_capacity(count)
+        rows = []
+        while self._free and len(rows) < count:
+            rows.append(self._free.pop())
+        while len(rows) < count:
+            rows.append(self._size)
+            self._size += 1
+            self._row_keys.append(None)
+            self._snippets.append("")
+        return rows
+
+    def _release(self, page_id: str, chunk_id: str) -> None:
+        row, _ = self._rows.pop((page_id, chunk_id))
+        self._alive[row] = False
+        self._row_keys[row] = None
+        self._snippets[row] = ""
+        self._free.append(row)
+
+    # -------------------------------------------------------------------------
+    # Updates
+    # -------------------------------------------------------------------------
+    def upsert_page(
+        self,
+        page_id: str,
+        chunks: Sequence[Tuple[str, str]],
+        title: str = "",
+        url: Optional[str] = None,
+        last_edited_time: Optional[str] = None,
+    ) -> int:
+        """
+        Replace a page's chunks. Returns the number of chunks (re)embedded.
+        """
+        wanted = {chunk_id: text for chunk_id, text in chunks}
+        existing = self._page_chunks.get(page_id, set())
+        for chunk_id in existing - wanted.keys():
+            self._release(page_id, chunk_id)
+        changed = [
+            (chunk_id, text)
+            for chunk_id, text in wanted.items()
+            if self._rows.get((page_id, chunk_id), (None, None))[1] != _text_hash(text)
+        ]
+        if changed:
+            vectors = self.embedder([text for _, text in changed])
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+            for chunk_id, _ in changed:
+                if (page_id, chunk_id) in self._rows:
+                    self._release(page_id, chunk_id)
+            rows = self._allocate(len(changed))
+            self._write_rows(rows, vectors)
+            for row, (chunk_id, text) in zip(rows, changed):
+                self._rows[(page_id, chunk_id)] = (row, _text_hash(text))
+                self._row_keys[row] = (page_id, chunk_id)
+                self._snippets[row] = text[:200]
+        self._page_chunks[page_id] = set(wanted)
+        self._pages[page_id] = {
+            "title": title,
+            "url": url,
+            "last_edited_time": last_edited_time,
+        }
+        return len(changed)
+
+    def remove_page(self, page_id: str) -> None:
+        for chunk_id in self._page_chunks.pop(page_id, set()):
+            self._release(page_id, chunk_id)
+        self._pages.pop(page_id, None)
+
+    def sync_from(self, mirror: Any) -> Dict[str, int]:
+        """Embed changed pages of a WorkspaceMirror; drop pages it no longer has."""
+        current = mirror.content_versions()
+        embedded = 0
+        for page_id, edited in current.items():
+            known = self._pages.get(page_id)
+            if known is not None and known["last_edited_time"] == edited:
+                continue
+            page = mirror.get(page_id) or {}
+            embedded += self.upsert_page(
+                page_id,
+                chunk_blocks(mirror.block_tree(page_id) or []),
+                title=object_title(page),
+                url=page.get("url"),
+                last_edited_time=edited,
+            )
+        removed = self._pages.keys() - current.keys()
+        for page_id in removed:
+            self.remove_page(page_id)
+        return {"embedded": embedded, "removed": len(removed)}
+
+    # -------------------------------------------------------------------------
+    # Queries
+    # -------------------------------------------------------------------------
+    def _scores(self, queries: np.ndarray) -> np.ndarray:
+        """(n_rows, n_queries) similarity matrix; dead rows score -inf."""
+        n = self._size
+        scores = np.empty((n, queries.shape[0]), dtype=np.float32)
+        for start in range(0, n, _SCORE_BLOCK_ROWS):
+            stop = min(n, start + _SCORE_BLOCK_ROWS)
+            block = self._matrix[start:stop]
+            if self.quantize:
+                block = block.astype(np.float32) * self._scales[start:stop, None]
+            np.matmul(block, queries.T, out=scores[start:stop])
+        scores[~self._alive[:n]] = -np.inf
+        return scores
+
+    def search_batch(
+        self, queries: Sequence[str], top_k: int = 5
+    ) -> List[List[Dict[str, Any]]]:
+        """Top pages for each query, best chunk per page, one matrix product."""
+        if not queries or not self._rows or top_k <= 0:
+            return [[] for _ in queries]
+        vectors = np.asarray(self.embedder(list(queries)), dtype=np.float32)
+        scores = self._scores(vectors)
+        out = []
+        for column in range(scores.shape[1]):
+            col = scores[:, column]
+            # Over-fetch chunks, widening while pages with many matching
+            # chunks leave fewer than top_k distinct pages.
+            k = min(self._size, top_k * 4)
+            while True:
+                candidates = np.argpartition(-col, k - 1)[:k]
+                candidates = candidates[np.argsort(-col[candidates])]
+                results = self._collapse(candidates, col, top_k)
+                if len(results) >= top_k or k >= self._size:
+                    break
+                k = min(self._size, k * 4)
+            out.append(results)
+        return out
+
+    def search(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
+        """Best-matching pages for ``query`` by cosine similarity."""
+        return self.search_batch([query], top_k)[0]
+
+    def _collapse(
+        self, rows: np.ndarray, scores: np.ndarray, top_k: int
+    ) -> List[Dict[str, Any]]:
+        results: List[Dict[str, Any]] = []
+        seen: Set[str] = set()
+        for row in rows:
+            key = self._row_keys[row]
+            if key is None or not np.isfinite(scores[row]) or key[0] in seen:
+                continue
+            page_id, chunk_id = key
+            seen.add(page_id)
+            page = self._pages.get(page_id, {})
+            results.append(
+                {
+                    "page_id": page_id,
+                    "chunk_id": chunk_id,
+                    "title": page.get("title", ""),
+                    "url": page.get("url"),
+                    "snippet": self._snippets[row],
+                    "score": float(scores[row]),
+                }
+            )
+            if len(results) >= top_k:
+                break
+        return results
+
+    # -------------------------------------------------------------------------
+    # Persistence
+    # -------------------------------------------------------------------------
+    def save(self, directory: str) -> None:
+        """Write the matrix (.npy) and row metadata (JSON) to ``directory``."""
+        directory = os.path.expanduser(directory)
+        os.makedirs(directory, exist_ok=True)
+        n = self._size
+        if self._matrix is None:
+            matrix = np.zeros((0, self.dim or 0), dtype=np.float32)
+        else:
+            matrix = self._matrix[:n]
+        np.save(os.path.join(directory, "vectors.npy"), matrix)
+        np.save(os.path.join(directory, "scales.npy"), self._scales[:n])
+        np.save(os.path.join(directory, "alive.npy"), self._alive[:n])
+        meta = {
+            "dim": self.dim,
+            "quantize": self.quantize,
+            "row_keys": self._row_keys,
+            "snippets": self._snippets,
+            "hashes": {f"{p}\t{c}": h for (p, c), (_, h) in self._rows.items()},
+            "pages": self._pages,
+        }
+        with open(os.path.join(directory, "meta.json"), "w") as f:
+            json.dump(meta, f)
+
+    @classmethod
+    def load(
+        cls, directory: str, embedder: Optional[Embedder] = None, mmap: bool = True
+    ) -> "VectorIndex":
+        """
+        Load a saved index. With ``mmap`` the matrix is memory-mapped
+        read-only and only copied into memory on the first write.
+        """
+        directory = os.path.expanduser(directory)
+        with open(os.path.join(directory, "meta.json")) as f:
+            meta = json.load(f)
+        index = cls(embedder=embedder, dim=meta["dim"], quantize=meta["quantize"])
+        mode = "r" if mmap else None
+        index._matrix = np.load(os.path.join(directory, "vectors.npy"), mmap_mode=mode)
+        index._scales = np.load(os.path.join(directory, "scales.npy"))
+        index._alive = np.load(os.path.join(directory, "alive.npy"))
+        index._size = index._matrix.shape[0]
+        index._row_keys = [tuple(k) if k else None for k in meta["row_keys"]]
+        index._snippets = meta["snippets"]
+        index._pages = meta["pages"]
+        for row, key in enumerate(index._row_keys):
+            if key is None:
+                index._free.append(row)
+                continue
+            page_id, chunk_id = key
+            index._rows[key] = (row, meta["hashes"][f"{page_id}\t{chunk_id}"])
+            index._page_chunks.setdefault(page_id, set()).add(chunk_id)
+        return index